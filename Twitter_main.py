@@ -1,5 +1,7 @@
 # tools/twitter_automation_robust.py
+import os
 import time
+from typing import Optional
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -7,12 +9,17 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from tools.lean_browser import COMPOSE_URLS, apply_lean_options, block_resources, lean_enabled, record_session
 
 class RobustTwitterPoster:
     """Enhanced Twitter automation with multiple fallback methods"""
     
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, profile_dir: Optional[str] = None, lean: Optional[bool] = None):
         self.headless = headless
+        # One Chrome profile per account keeps each account's login session separate
+        self.profile_dir = os.path.expanduser(profile_dir or "~/chrome_twitter_profile")
+        self.lean = lean_enabled(lean)
+        self.last_session = {}  # time-to-interactive and memory of the last post
         self.driver = None
         
     def setup_driver(self):
@@ -29,16 +36,18 @@ class RobustTwitterPoster:
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        if self.lean:
+            apply_lean_options(chrome_options)
         
         # User data directory for persistent sessions
-        import os
-        user_data_dir = os.path.expanduser("~/chrome_twitter_profile")
-        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+        chrome_options.add_argument(f"--user-data-dir={self.profile_dir}")
         
         try:
             self.driver = webdriver.Chrome(options=chrome_options)
             # Execute script to remove webdriver property
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            if self.lean:
+                block_resources(self.driver)
             return True
         except Exception as e:
             print(f"❌ Chrome driver setup failed: {str(e)}")
@@ -73,17 +82,18 @@ class RobustTwitterPoster:
         print("⚠️ Couldn't detect login. Proceeding anyway...")
         return True
     
-    def find_compose_box(self):
+    def find_compose_box(self, open_composer: bool = True):
         """Try multiple methods to find the tweet compose box"""
         
         # Method 1: Try clicking "Post" or "Tweet" button first
+        # (skipped when the compose URL already opened the composer)
         post_button_selectors = [
             "//span[text()='Post']",
             "//span[text()='Tweet']", 
             "//div[@data-testid='SideNav_NewTweet_Button']",
             "//a[@data-testid='SideNav_NewTweet_Button']",
             "//div[contains(@aria-label, 'Post')]"
-        ]
+        ] if open_composer else []
         
         for selector in post_button_selectors:
             try:
@@ -133,21 +143,24 @@ class RobustTwitterPoster:
                 return False
         
         try:
-            # Navigate to Twitter
-            print("🌐 Opening Twitter...")
-            self.driver.get("https://twitter.com")
-            time.sleep(3)
+            navigated_at = self._open_twitter()
             
             # Check if we need to log in
             current_url = self.driver.current_url
             if "login" in current_url or "oauth" in current_url:
                 if not self.wait_for_login():
                     return False
+                if self.lean:
+                    navigated_at = self._open_twitter()
             
             # Try to find and use compose box
-            compose_box = self.find_compose_box()
+            compose_box = self.find_compose_box(open_composer=not self.lean)
+            if not compose_box and self.lean:
+                # The compose URL didn't open a composer; use the regular way
+                compose_box = self.find_compose_box()
             
             if compose_box:
+                self.last_session = record_session("twitter", self.driver, navigated_at)
                 try:
                     # Clear any existing content
                     compose_box.click()
@@ -199,6 +212,18 @@ class RobustTwitterPoster:
             print(f"❌ Twitter posting error: {str(e)}")
             return False
     
+    def _open_twitter(self) -> float:
+        """Navigate to Twitter (straight to the composer in lean mode); returns the start time"""
+        navigated_at = time.monotonic()
+        if self.lean:
+            print("🌐 Opening Twitter composer...")
+            self.driver.get(COMPOSE_URLS["twitter"])
+        else:
+            print("🌐 Opening Twitter...")
+            self.driver.get("https://twitter.com")
+            time.sleep(3)
+        return navigated_at
+    
     def guided_posting_mode(self, content: str):
         """Interactive guided posting when automation fails"""
         print("\n" + "="*60)
@@ -221,6 +246,7 @@ class RobustTwitterPoster:
         """Close the browser driver"""
         if self.driver:
             self.driver.quit()
+            self.driver = None  # a later post starts a fresh browser
 
 # Simple test function
 def test_twitter_posting():
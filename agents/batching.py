@@ -0,0 +1,254 @@
+# agents/batching.py
+"""
+Opt-in micro-batching of model calls (MICRO_BATCH_ENABLED).
+Writer and research calls arriving within a short window are sent as one
+multi-item structured prompt, so a burst of small requests costs one request
+against the provider quota. Each caller gets its own item back; items missing
+or malformed in the batch response are retried individually, within what is
+left of that caller's timeout.
+"""
+import json
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from agents.json_output import parse_json_output
+from agents.prompts import context_key
+from agents.providers import ProviderRouter, get_router
+from tools.metrics import metrics
+from tools.resilience import DeadlineExceeded
+
+# Below this many seconds left, a failed item is not worth retrying alone
+MIN_RETRY_SECONDS = 0.5
+
+
+class BatchItemError(Exception):
+    """One item of a batch came back missing or unusable"""
+
+
+class BatchRequest:
+    """A single generate() call waiting in a batch"""
+
+    def __init__(self, prompt: str, context: Optional[str], timeout: Optional[float]):
+        self.prompt = prompt
+        self.context = context
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left of the caller's timeout (None without one; never 0, which means no timeout)"""
+        return None if self.deadline is None else max(0.01, self.deadline - time.monotonic())
+
+
+class MicroBatcher:
+    """Collects items for up to `window` seconds or `max_items`, then runs them together.
+
+    handler receives the list of items and returns one result per item; a result
+    that is an Exception is raised to that item's caller only.
+    """
+
+    def __init__(self, name: str, handler: Callable[[List[Any]], List[Any]],
+                 window: float, max_items: int):
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.max_items = max_items
+        self._pending: List[Tuple[Any, Future]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Add an item and block until its result is available (DeadlineExceeded after timeout)"""
+        future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((item, future))
+            if len(self._pending) >= self.max_items:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            # A full batch runs on the thread that filled it
+            self._run(batch)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # The batch is still running for the other items; this caller can't wait for it
+            metrics.incr(f"batch.{self.name}.timeouts")
+            raise DeadlineExceeded(f"batched {self.name} call exceeded {timeout:.1f}s")
+
+    def _take(self) -> List[Tuple[Any, Future]]:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch: List[Tuple[Any, Future]]):
+        metrics.incr(f"batch.{self.name}.batches")
+        metrics.incr(f"batch.{self.name}.items", len(batch))
+        try:
+            results = self.handler([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def _batch_schema(json_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response schema for a batch: one entry per item, tagged with its id"""
+    value = {"data": json_schema} if json_schema else {"text": {"type": "STRING"}}
+    return {
+        "type": "OBJECT",
+        "properties": {
+            "items": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {"id": {"type": "STRING"}, **value},
+                    "required": ["id", *value]
+                }
+            }
+        },
+        "required": ["items"]
+    }
+
+
+def _batch_prompt(requests: List[BatchRequest], structured: bool) -> str:
+    """One prompt holding every task; shared contexts are listed once and referenced"""
+    context_ids: Dict[str, str] = {}
+    sections = []
+    for request in requests:
+        if request.context:
+            key = context_key(request.context)
+            if key not in context_ids:
+                context_ids[key] = f"C{len(context_ids) + 1}"
+                sections.append(f"=== CONTEXT {context_ids[key]} ===\n{request.context}")
+
+    tasks = []
+    for i, request in enumerate(requests):
+        uses = f" (uses CONTEXT {context_ids[context_key(request.context)]})" if request.context else ""
+        tasks.append(f"=== TASK {i}{uses} ===\n{request.prompt.strip()}")
+
+    answer_field = "data (the JSON result for that task)" if structured else "text (the complete answer to that task)"
+    return (
+        "Complete each of the following independent tasks separately. "
+        "Do not mix content between tasks.\n\n"
+        + "\n\n".join(sections + tasks)
+        + f"\n\nReturn a JSON object whose items list has one entry per task with its id "
+        f"(the task number as a string) and {answer_field}."
+    )
+
+
+class BatchingLLM:
+    """Drop-in for ProviderRouter.generate that batches concurrent calls per tier and schema"""
+
+    def __init__(self, router: ProviderRouter, window: Optional[float] = None, max_items: Optional[int] = None):
+        self.router = router
+        self.window = window if window is not None else settings.MICRO_BATCH_WINDOW
+        self.max_items = max_items or settings.MICRO_BATCH_MAX_ITEMS
+        self._batchers: Dict[Tuple[Optional[str], str], MicroBatcher] = {}
+        self._lock = threading.Lock()
+
+    def _batcher(self, tier: Optional[str], json_schema: Optional[Dict[str, Any]]) -> MicroBatcher:
+        # Only calls for the same model and output shape can share a prompt
+        key = (tier, json.dumps(json_schema, sort_keys=True) if json_schema else "")
+        with self._lock:
+            if key not in self._batchers:
+                self._batchers[key] = MicroBatcher(
+                    f"{tier or 'standard'}{'.json' if json_schema else ''}",
+                    lambda requests: self._run_batch(requests, tier, json_schema),
+                    self.window, self.max_items
+                )
+            return self._batchers[key]
+
+    @staticmethod
+    def _batch_timeout(requests: List[BatchRequest]) -> Optional[float]:
+        """One response holds every item, so it takes longer than a single call.
+
+        The tightest item's time left, grown by MICRO_BATCH_TIMEOUT_PER_ITEM of it per
+        extra item, and never longer than the most patient item will wait.
+        """
+        remaining = [r.remaining() for r in requests if r.deadline is not None]
+        if not remaining:
+            return None
+        scaled = min(remaining) * (1 + settings.MICRO_BATCH_TIMEOUT_PER_ITEM * (len(requests) - 1))
+        return min(scaled, max(remaining))
+
+    def _run_batch(self, requests: List[BatchRequest], tier: Optional[str],
+                   json_schema: Optional[Dict[str, Any]]) -> List[Any]:
+        if len(requests) == 1:
+            request = requests[0]
+            return [self.router.generate(request.prompt, tier=tier, json_schema=json_schema,
+                                         timeout=request.remaining(), context=request.context)]
+
+        try:
+            raw = self.router.generate(
+                _batch_prompt(requests, bool(json_schema)), tier=tier,
+                json_schema=_batch_schema(json_schema), timeout=self._batch_timeout(requests)
+            )
+            data, _ = parse_json_output(raw)
+        except Exception as e:
+            # Every item is retried alone, so one bad batch costs a retry rather than failures
+            return [BatchItemError(f"Batch of {len(requests)} failed: {str(e)}")] * len(requests)
+        entries = data.get("items", []) if isinstance(data, dict) else []
+        by_id = {str(entry.get("id")): entry for entry in entries if isinstance(entry, dict)}
+
+        results = []
+        for i in range(len(requests)):
+            entry = by_id.get(str(i), {})
+            value = entry.get("data") if json_schema else entry.get("text")
+            if not value:
+                results.append(BatchItemError(f"Item {i} missing from batch response"))
+            else:
+                # Callers parse structured output themselves, as with a direct call
+                results.append(json.dumps(value) if json_schema else str(value))
+        return results
+
+    def generate(self, prompt: str, tier: Optional[str] = None,
+                 json_schema: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None,
+                 context: Optional[str] = None) -> str:
+        """Generate text, sharing a provider request with concurrent calls"""
+        request = BatchRequest(prompt, context, timeout)
+        try:
+            return self._batcher(tier, json_schema).submit(request, timeout)
+        except BatchItemError as e:
+            # A failed item must not fail its caller when a direct call would work,
+            # but the retry only gets what is left of the caller's timeout
+            remaining = request.remaining()
+            if remaining is not None and remaining < MIN_RETRY_SECONDS:
+                metrics.incr("batch.item_retries_skipped")
+                raise DeadlineExceeded(f"no time left to retry batched call: {str(e)}")
+            metrics.incr("batch.item_retries")
+            print(f"⚠️ Batched call failed, retrying alone: {str(e)}")
+            return self.router.generate(prompt, tier=tier, json_schema=json_schema,
+                                        timeout=remaining, context=context)
+
+
+_batching_llm = None
+_batching_lock = threading.Lock()
+
+
+def get_llm():
+    """Model client for agents: the provider router, wrapped in a micro-batcher when enabled"""
+    global _batching_llm
+    if not settings.MICRO_BATCH_ENABLED:
+        return get_router()
+    with _batching_lock:
+        if _batching_llm is None:
+            _batching_llm = BatchingLLM(get_router())
+        return _batching_llm
@@ -0,0 +1,85 @@
+# agents/json_output.py
+"""
+Single-pass parsing of JSON returned by language models.
+Handles markdown fences, leading prose and output truncated mid-document.
+"""
+import json
+from typing import Any, Optional, Tuple
+
+
+class JSONOutputError(ValueError):
+    """Raised when model output contains no recoverable JSON document"""
+
+
+def _scan_json(text: str) -> Tuple[Optional[str], bool]:
+    """Scan a JSON document once, returning (document_text, was_repaired).
+
+    A complete document is cut at its closing bracket, dropping anything after it
+    (closing fences, trailing prose). A truncated document is repaired by closing
+    the open string and brackets, or by cutting back to the last complete element.
+    """
+    stack = []
+    in_string = False
+    escape = False
+    last_complete = None  # (index, open brackets) at the last comma outside a string
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                return None, False
+            stack.pop()
+            if not stack:
+                return text[:i + 1], False
+        elif ch == ",":
+            # Everything before a comma is a complete element or key/value pair
+            last_complete = (i, list(stack))
+
+    if not stack:
+        return None, False
+
+    # Truncated: first try closing what is open, then cut back to the last complete element
+    closed = (text + ('"' if in_string else "")).rstrip().rstrip(",")
+    candidates = [closed + "".join(reversed(stack))]
+    if last_complete:
+        index, open_brackets = last_complete
+        candidates.append(text[:index] + "".join(reversed(open_brackets)))
+
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return candidate, True
+        except json.JSONDecodeError:
+            continue
+    return None, False
+
+
+def parse_json_output(text: str) -> Tuple[Any, bool]:
+    """Parse the first JSON object or array in model output.
+
+    Returns (data, was_repaired). Raises JSONOutputError if nothing can be recovered.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise JSONOutputError("No JSON document found in model output")
+
+    document, repaired = _scan_json(text[min(starts):])
+    if document is None:
+        raise JSONOutputError("Model output is not valid or repairable JSON")
+
+    try:
+        return json.loads(document), repaired
+    except json.JSONDecodeError as e:
+        raise JSONOutputError(f"Model output is not valid JSON: {str(e)}") from e
@@ -0,0 +1,85 @@
+# agents/prompts.py
+"""
+Prompt assembly for the writers.
+The research insights and the long instruction preamble are identical for
+every platform in a run, so they are built once into a shared context and
+sent as a stable prefix. Providers that support context caching reuse it
+instead of re-reading it; the per-platform prompt is only the short task.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List
+
+WRITER_PREAMBLE = """You are a social media writer for a professional content brand.
+
+Voice and rules for every post:
+- Positive, educational and accurate; never sensational or alarming
+- No claims about deaths, accidents, tragedies or unverified news
+- Professional but conversational tone, written for a busy reader
+- Strong opening hook, one clear idea per sentence
+- End with a call to action or a question that invites replies
+- Hashtags go at the end, relevant to the topic, no hashtag stuffing
+- Return ONLY the post text, with no preamble, notes or quotes"""
+
+# Recently built contexts, so writers running in one process share the same string
+_MAX_CONTEXTS = 256
+_contexts: "OrderedDict[str, str]" = OrderedDict()
+_contexts_lock = threading.Lock()
+
+
+def context_key(context: str) -> str:
+    """Stable id of a shared context, used for provider-side caches"""
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+def shared_context(topic: str, insights: List[str]) -> str:
+    """Run-level writer context: instructions plus the research, built once.
+
+    The content type belongs to the task, so every (platform, content type)
+    variant of a run shares this exact prefix.
+    """
+    key = context_key("\x00".join([topic, *insights]))
+    with _contexts_lock:
+        if key in _contexts:
+            _contexts.move_to_end(key)
+            return _contexts[key]
+
+    insights_text = "\n".join(f"• {insight}" for insight in insights)
+    context = (
+        f"{WRITER_PREAMBLE}\n\n"
+        f'Topic: write about "{topic}"\n\n'
+        f"Research insights (most important first):\n{insights_text}"
+    )
+
+    with _contexts_lock:
+        _contexts[key] = context
+        while len(_contexts) > _MAX_CONTEXTS:
+            _contexts.popitem(last=False)
+    return context
+
+
+def twitter_task(content_type: str = "educational", proven_tags_hint: str = "") -> str:
+    """Platform-specific instructions appended after the shared context"""
+    return f"""Task: write one {content_type} tweet using the shared context.
+- Maximum 280 characters
+- Use the strongest 1-3 insights only
+- Include 2-3 relevant hashtags
+{proven_tags_hint}"""
+
+
+def linkedin_task(content_type: str = "educational", proven_tags_hint: str = "") -> str:
+    """Platform-specific instructions appended after the shared context"""
+    return f"""Task: write one {content_type} LinkedIn post using the shared context.
+- 500-1500 characters (LinkedIn sweet spot)
+- Bullet points or numbered lists for the insights
+- Include a thought-provoking question
+- 3-5 relevant hashtags at the end
+{proven_tags_hint}
+
+Structure:
+1. Hook/Opening statement
+2. Main insights (use bullet points)
+3. Personal take or conclusion
+4. Call to action question
+5. Hashtags"""
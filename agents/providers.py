@@ -0,0 +1,464 @@
+# agents/providers.py
+"""
+Interchangeable LLM backends and a latency-aware router.
+Agents call get_router().generate(...) instead of a specific SDK. The router
+tries providers in order of live latency and error rate, preferring
+Settings.AI_PROVIDER, and fails over to the next one automatically.
+"""
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.settings import settings
+from agents.prompts import context_key
+from tools.metrics import metrics
+from tools.rate_limit import is_throttle_error
+from tools.resilience import get_guard, guarded_call
+
+# Latency samples needed before a provider's p50 is trusted for routing
+ROUTING_MIN_SAMPLES = 5
+# Scores of the configured AI_PROVIDER are discounted so it wins unless clearly slower
+PREFERRED_PROVIDER_BIAS = 0.75
+# After a transient failure to create a context cache, send the context inline for this long
+CONTEXT_CACHE_RETRY_AFTER = 60  # seconds
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for errors worth retrying later (throttling, timeouts, 5xx) rather than permanent refusals"""
+    if is_throttle_error(error) or isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int) and code >= 500:
+        return True
+    name = type(error).__name__.lower()
+    return any(word in name for word in ("unavailable", "internal", "deadline", "timeout", "connection"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for providers that don't report usage"""
+    return max(1, len(text) // 4)
+
+
+class LLMProvider:
+    """Base class for text generation backends"""
+
+    name = "base"
+
+    def __init__(self, default_model: str):
+        self.default_model = default_model
+
+    def model_for_tier(self, tier: Optional[str]) -> str:
+        """Concrete model name for a tier ("standard", "research", "fast")"""
+        return settings.MODEL_TIERS.get(self.name, {}).get(tier or "standard", self.default_model)
+
+    def generate(self, prompt: str, model: Optional[str] = None,
+                 json_schema: Optional[Dict[str, Any]] = None,
+                 request_timeout: Optional[float] = None,
+                 context: Optional[str] = None) -> str:
+        """Return the generated text. With json_schema, the text is a JSON document.
+
+        context is a shared prefix reused across calls (see agents/prompts.py);
+        providers cache it where they can, otherwise it is sent before the prompt.
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt: str, model: Optional[str] = None,
+               request_timeout: Optional[float] = None,
+               context: Optional[str] = None) -> Iterator[str]:
+        """Yield the generated text in chunks. Closing the iterator stops generation.
+
+        Backends without streaming yield the whole response as one chunk.
+        """
+        yield self.generate(prompt, model=model, request_timeout=request_timeout, context=context)
+
+    def _record_usage(self, prompt_tokens: int, cached_tokens: int, started: float, streamed: bool = False):
+        """Prompt token metrics, overall and per provider, plus time to first token (streams)
+        or to the whole response (other calls)"""
+        elapsed_ms = (time.monotonic() - started) * 1000
+        for prefix in ("llm", f"llm.{self.name}"):
+            metrics.incr(f"{prefix}.prompt_tokens", prompt_tokens)
+            metrics.incr(f"{prefix}.cached_prompt_tokens", cached_tokens)
+        gauge = "ttft_ms" if streamed else "response_ms"
+        metrics.set_gauge(f"llm.{self.name}.{gauge}", round(elapsed_ms, 1))
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google-generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, default_model: Optional[str] = None):
+        import google.generativeai as genai
+
+        super().__init__(default_model or settings.DEFAULT_MODEL)
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self._genai = genai
+        self._models = {}
+        # (model, context key) -> (model bound to a CachedContent, expiry)
+        self._cached_models = {}
+        self._cache_unsupported = set()
+        self._cache_retry_at = {}  # model -> monotonic time to try creating caches again
+        self._cache_creating = set()  # keys whose cache another thread is creating
+        self._cache_lock = threading.Lock()
+
+    def _model(self, model: str):
+        if model not in self._models:
+            self._models[model] = self._genai.GenerativeModel(model)
+        return self._models[model]
+
+    def _cached_model(self, model: str, context: str):
+        """Model reading the context from a server-side cache, or None to send it inline"""
+        if (not settings.CONTEXT_CACHE_ENABLED or model in self._cache_unsupported
+                or estimate_tokens(context) < settings.CONTEXT_CACHE_MIN_TOKENS):
+            return None
+        key = (model, context_key(context))
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cached_models.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+            if key in self._cache_creating or self._cache_retry_at.get(model, 0) > now:
+                # Don't wait on another thread's create (or a recent failure): send inline this time
+                return None
+            self._cache_creating.add(key)
+        # Created outside the lock so a slow create doesn't hold up calls for other contexts
+        try:
+            from google.generativeai import caching
+            cache = caching.CachedContent.create(
+                model=model,
+                contents=[context],
+                ttl=timedelta(seconds=settings.CONTEXT_CACHE_TTL)
+            )
+            cached = self._genai.GenerativeModel.from_cached_content(cached_content=cache)
+        except Exception as e:
+            with self._cache_lock:
+                if is_transient_error(e):
+                    self._cache_retry_at[model] = time.monotonic() + CONTEXT_CACHE_RETRY_AFTER
+                else:
+                    # Only pinned model versions support explicit caching
+                    self._cache_unsupported.add(model)
+            print(f"⚠️ Context caching unavailable for {model}: {str(e)}")
+            return None
+        finally:
+            with self._cache_lock:
+                self._cache_creating.discard(key)
+        with self._cache_lock:
+            # Expire locally a little early so we never reference a deleted cache
+            self._cached_models[key] = (cached, time.monotonic() + settings.CONTEXT_CACHE_TTL * 0.9)
+        metrics.incr("llm.gemini.context_caches_created")
+        return cached
+
+    def generate(self, prompt, model=None, json_schema=None, request_timeout=None, context=None):
+        generation_config = None
+        if json_schema:
+            generation_config = self._genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=json_schema
+            )
+        model = model or self.default_model
+        cached_model = self._cached_model(model, context) if context else None
+        contents = prompt
+        if context and not cached_model:
+            # Same prefix on every call lets Gemini's implicit caching apply
+            contents = f"{context}\n\n{prompt}"
+        started = time.monotonic()
+        response = (cached_model or self._model(model)).generate_content(
+            contents,
+            generation_config=generation_config,
+            request_options={"timeout": request_timeout or settings.MODEL_CALL_TIMEOUT}
+        )
+        usage = getattr(response, "usage_metadata", None)
+        self._record_usage(
+            getattr(usage, "prompt_token_count", 0) or estimate_tokens(contents),
+            getattr(usage, "cached_content_token_count", 0) or 0,
+            started
+        )
+        return response.text
+
+    def stream(self, prompt, model=None, request_timeout=None, context=None):
+        model = model or self.default_model
+        cached_model = self._cached_model(model, context) if context else None
+        contents = f"{context}\n\n{prompt}" if context and not cached_model else prompt
+        started = time.monotonic()
+        response = (cached_model or self._model(model)).generate_content(
+            contents,
+            stream=True,
+            request_options={"timeout": request_timeout or settings.MODEL_CALL_TIMEOUT}
+        )
+        first = True
+        finished = False
+        try:
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    text = ""  # chunk carrying only finish or safety metadata
+                if first and text:
+                    self._record_usage(estimate_tokens(contents), 0, started, streamed=True)
+                    first = False
+                if text:
+                    yield text
+            finished = True
+        finally:
+            if not finished:
+                self._cancel_stream(response)
+
+    @staticmethod
+    def _cancel_stream(response):
+        """Stop the server generating the rest of an abandoned stream.
+
+        The SDK response wraps the transport's iterator: a gRPC call (cancel())
+        or a REST line reader (close()). Simply dropping the response would let
+        generation, and its token cost, run to the end.
+        """
+        iterator = getattr(response, "_iterator", None)
+        for method in ("cancel", "close"):
+            stop = getattr(iterator, method, None)
+            if callable(stop):
+                try:
+                    stop()
+                    metrics.incr("llm.gemini.streams_cancelled")
+                except Exception:
+                    pass
+                return
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """OpenAI or any server exposing the OpenAI chat completions API (vLLM, Ollama, llama.cpp)"""
+
+    name = "openai"
+
+    def __init__(self, default_model: Optional[str] = None):
+        from openai import OpenAI
+
+        super().__init__(default_model or settings.OPENAI_MODEL)
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY or "not-needed",
+            base_url=settings.OPENAI_BASE_URL
+        )
+
+    def generate(self, prompt, model=None, json_schema=None, request_timeout=None, context=None):
+        kwargs = {}
+        if json_schema:
+            # json_object mode is the most widely supported; the schema goes in the prompt
+            kwargs["response_format"] = {"type": "json_object"}
+            prompt += f"\n\nRespond with a JSON object matching this schema:\n{json.dumps(json_schema)}"
+        messages = [{"role": "user", "content": prompt}]
+        if context:
+            # A stable leading system message is what OpenAI prefix caching (and vLLM prefix reuse) keys on
+            messages.insert(0, {"role": "system", "content": context})
+        started = time.monotonic()
+        response = self.client.chat.completions.create(
+            model=model or self.default_model,
+            messages=messages,
+            timeout=request_timeout or settings.MODEL_CALL_TIMEOUT,
+            **kwargs
+        )
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        self._record_usage(
+            getattr(usage, "prompt_tokens", 0) or estimate_tokens((context or "") + prompt),
+            getattr(details, "cached_tokens", 0) or 0,
+            started
+        )
+        return response.choices[0].message.content or ""
+
+    def stream(self, prompt, model=None, request_timeout=None, context=None):
+        messages = [{"role": "user", "content": prompt}]
+        if context:
+            messages.insert(0, {"role": "system", "content": context})
+        started = time.monotonic()
+        response = self.client.chat.completions.create(
+            model=model or self.default_model,
+            messages=messages,
+            timeout=request_timeout or settings.MODEL_CALL_TIMEOUT,
+            stream=True
+        )
+        first = True
+        try:
+            for chunk in response:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if first and text:
+                    self._record_usage(estimate_tokens((context or "") + prompt), 0, started, streamed=True)
+                    first = False
+                if text:
+                    yield text
+        finally:
+            # Closing the HTTP stream makes the server stop generating
+            response.close()
+
+
+class StubProvider(LLMProvider):
+    """Deterministic local backend for tests and offline runs"""
+
+    name = "stub"
+
+    def __init__(self, default_model: str = "stub"):
+        super().__init__(default_model)
+        # Local stand-in for provider context caching: context key -> expiry
+        self._context_cache: Dict[str, float] = {}
+        self._cache_lock = threading.Lock()
+
+    def generate(self, prompt, model=None, json_schema=None, request_timeout=None, context=None):
+        started = time.monotonic()
+        cached_tokens = 0
+        if context:
+            key = context_key(context)
+            with self._cache_lock:
+                if settings.CONTEXT_CACHE_ENABLED and self._context_cache.get(key, 0) > started:
+                    cached_tokens = estimate_tokens(context)
+                self._context_cache[key] = started + settings.CONTEXT_CACHE_TTL
+        self._record_usage(estimate_tokens((context or "") + prompt), cached_tokens, started)
+
+        topic_match = re.search(r'about "([^"]+)"', f"{context or ''}\n{prompt}")
+        topic = topic_match.group(1) if topic_match else "this topic"
+        if json_schema:
+            return json.dumps(self._fill(json_schema, "result", topic, prompt))
+        return self._text(topic)
+
+    def stream(self, prompt, model=None, request_timeout=None, context=None):
+        text = self.generate(prompt, model=model, request_timeout=request_timeout, context=context)
+        for word in re.findall(r'\S+\s*', text):
+            yield word
+
+    def _text(self, topic: str) -> str:
+        return f"Three quick takeaways on {topic} worth a look today. Which one would you try first? #Tips #Learning"
+
+    def _fill(self, schema: Dict[str, Any], name: str, topic: str, prompt: str) -> Any:
+        """Value matching a response schema"""
+        if schema.get("type") == "OBJECT":
+            return {key: self._fill(value, key, topic, prompt) for key, value in schema.get("properties", {}).items()}
+        if schema.get("type") == "ARRAY":
+            item = schema.get("items", {})
+            if "id" in item.get("properties", {}):
+                # Multi-item batch prompt (agents/batching.py): one entry per task
+                return [{**self._fill(item, name, topic, prompt), "id": task}
+                        for task in re.findall(r'=== TASK (\d+)', prompt)]
+            return [self._fill(item, name, topic, prompt)]
+        if name == "text":
+            return self._text(topic)
+        return f"{name.replace('_', ' ').capitalize()} for {topic}"
+
+
+PROVIDER_CLASSES = {
+    "gemini": GeminiProvider,
+    "openai": OpenAICompatibleProvider,
+    "stub": StubProvider,
+}
+
+
+class ProviderRouter:
+    """Picks a provider per call from live latency and error statistics, with failover"""
+
+    def __init__(self, providers: List[LLMProvider], preferred: Optional[str] = None):
+        if not providers:
+            raise ValueError("At least one LLM provider must be configured")
+        self.providers = providers
+        self.preferred = preferred or settings.AI_PROVIDER
+
+    def _score(self, provider: LLMProvider, tier: Optional[str]) -> float:
+        guard = get_guard(provider.name, provider.model_for_tier(tier))
+        p50 = guard.latency.percentile(50, min_samples=ROUTING_MIN_SAMPLES)
+        # Unknown latency is treated as average so new providers still get traffic
+        score = (p50 if p50 is not None else 1.0) * (1 + 4 * guard.breaker.error_rate())
+        if provider.name == self.preferred:
+            score *= PREFERRED_PROVIDER_BIAS
+        return score
+
+    def ranked(self, tier: Optional[str] = None) -> List[LLMProvider]:
+        """Providers in the order they will be tried, open circuits last"""
+        return sorted(
+            self.providers,
+            key=lambda p: (not get_guard(p.name, p.model_for_tier(tier)).breaker.available(), self._score(p, tier))
+        )
+
+    def generate(self, prompt: str, tier: Optional[str] = None,
+                 json_schema: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None,
+                 context: Optional[str] = None) -> str:
+        """Generate text with the best available provider, failing over on errors"""
+        last_error = None
+        for provider in self.ranked(tier):
+            model = provider.model_for_tier(tier)
+            try:
+                text = guarded_call(
+                    provider.name, model, provider.generate, prompt,
+                    timeout=timeout, model=model, json_schema=json_schema, request_timeout=timeout,
+                    context=context
+                )
+                metrics.incr(f"router.{provider.name}.calls")
+                return text
+            except Exception as e:
+                last_error = e
+                metrics.incr(f"router.{provider.name}.failovers")
+                print(f"⚠️ {provider.name} failed, trying next provider: {str(e)}")
+        raise last_error
+
+    def stream(self, prompt: str, tier: Optional[str] = None,
+               timeout: Optional[float] = None,
+               context: Optional[str] = None) -> Iterator[str]:
+        """Stream text chunks from the best available provider.
+
+        Each stream runs under the provider's call guard (deadline on the first
+        chunk and the whole stream, latency and breaker tracking). Fails over
+        only before the first chunk. Closing the returned iterator cancels the
+        provider stream and frees its rate limit slot.
+        """
+        last_error: Optional[Exception] = None
+        for provider in self.ranked(tier):
+            model = provider.model_for_tier(tier)
+            chunks = get_guard(provider.name, model).stream(
+                provider.stream, prompt, timeout=timeout, model=model, request_timeout=timeout, context=context
+            )
+            started_output = False
+            try:
+                for chunk in chunks:
+                    started_output = True
+                    yield chunk
+                metrics.incr(f"router.{provider.name}.calls")
+                return
+            except Exception as e:
+                if started_output:
+                    raise
+                last_error = e
+                metrics.incr(f"router.{provider.name}.failovers")
+                print(f"⚠️ {provider.name} stream failed, trying next provider: {str(e)}")
+            finally:
+                chunks.close()
+        raise last_error or RuntimeError("No LLM provider available")
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def build_providers() -> List[LLMProvider]:
+    """Instantiate the configured providers, skipping failover ones without credentials or SDKs"""
+    names = settings.LLM_PROVIDERS or [settings.AI_PROVIDER]
+    if settings.AI_PROVIDER not in names:
+        names = [settings.AI_PROVIDER] + names
+    providers = []
+    for name in names:
+        # The primary provider is always built so missing keys surface as call errors and fallbacks
+        if name != settings.AI_PROVIDER:
+            if name == "gemini" and not settings.GEMINI_API_KEY:
+                continue
+            if name == "openai" and not (settings.OPENAI_API_KEY or settings.OPENAI_BASE_URL):
+                continue
+        try:
+            providers.append(PROVIDER_CLASSES[name]())
+        except (KeyError, ImportError) as e:
+            print(f"⚠️ Skipping LLM provider '{name}': {str(e)}")
+    return providers
+
+
+def get_router() -> ProviderRouter:
+    """Process-wide provider router shared by all agents"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter(build_providers())
+        return _router
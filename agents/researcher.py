@@ -1,24 +1,141 @@
 # agents/researcher_gemini.py
-import google.generativeai as genai
 from langchain_community.tools import DuckDuckGoSearchRun
-from typing import Dict, Any, List
-
-import json
-from datetime import datetime
+from pydantic import ValidationError
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, date
+import re
+import time
 from config.settings import settings
+from agents.json_output import parse_json_output, JSONOutputError
+from agents.batching import get_llm
+from tools.cache import search_cache, llm_cache, research_cache
+from tools.metrics import metrics
+from tools.rate_limit import rate_limiter
+from tools.singleflight import SingleFlight
+from tools.blob_store import blob_store
+from workflows.state import ResearchData
+from workflows.budget import remaining_budget, budget_below, node_tier, call_timeout
+
+RESEARCH_FIELDS = ["insights", "trends", "content_angles", "debates", "tips"]
+
+# Response schema sent to the provider in structured-output mode
+RESEARCH_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        field: {"type": "ARRAY", "items": {"type": "STRING"}}
+        for field in RESEARCH_FIELDS
+    },
+    "required": RESEARCH_FIELDS
+}
+
+# Concurrent runs researching the same topic share one search and model call
+_research_flight = SingleFlight("research")
+
+# Search queries of all research runs share one pool; the rate limiter bounds real concurrency
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+
+NO_SEARCH_RESULTS = "No search results available. Use your own up-to-date knowledge."
+
+def search_queries(topic: str, today: Optional[date] = None, count: Optional[int] = None) -> List[str]:
+    """Query formulations for a topic, dated from the current date"""
+    today = today or date.today()
+    queries = [
+        f"{topic} {today.year} latest trends",
+        f"{topic} news {today.strftime('%B %Y')}",
+        f"{topic} statistics research {today.year}",
+        f"{topic} best practices tips",
+        f"{topic} expert opinions debate",
+    ]
+    return queries[:count or settings.SEARCH_QUERY_COUNT]
+
+def merge_snippets(results: List[str], max_chars: Optional[int] = None) -> str:
+    """Merge search results, dropping sentences already seen in an earlier result"""
+    max_chars = max_chars or settings.SEARCH_MAX_CHARS
+    seen = set()
+    merged = []
+    length = 0
+    for text in results:
+        for sentence in re.split(r'(?<=[.!?])\s+|\s*\.\.\.\s*', text):
+            key = re.sub(r'\W+', ' ', sentence).strip().lower()
+            if len(key) < 20 or key in seen:
+                continue
+            seen.add(key)
+            if length + len(sentence) > max_chars:
+                return " ".join(merged)
+            merged.append(sentence.strip())
+            length += len(sentence) + 1
+    return " ".join(merged)
 
 class GeminiResearchAgent:
     def __init__(self):
-        # Configure Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # Calls go through the provider router (Gemini by default, see AI_PROVIDER),
+        # micro-batched with concurrent calls when MICRO_BATCH_ENABLED
+        self.llm = get_llm()
         self.search_tool = DuckDuckGoSearchRun()
+        self.structured_output = settings.RESEARCH_STRUCTURED_OUTPUT
+    
+    def _parse_research(self, text: str) -> ResearchData:
+        """Parse and validate the model response in one pass, repairing truncated JSON"""
+        data, repaired = parse_json_output(text)
+        research = ResearchData.model_validate(data)
+        
+        if repaired:
+            metrics.incr("research.json_repaired")
+        metrics.incr("research.parsed")
+        return research
+    
+    def _search_one(self, query: str, deadline: float) -> str:
+        search_key = search_cache.make_key(query)
+        results = search_cache.get(search_key)
+        if results is None:
+            # The request may have moved on while this query waited for a worker or a rate slot
+            if time.monotonic() >= deadline:
+                raise TimeoutError("search deadline passed before the query started")
+            results = rate_limiter.call("duckduckgo", "search", self.search_tool.run, query, deadline=deadline)
+            search_cache.set(search_key, results)
+        return results
     
-    def research_topic(self, topic: str) -> Dict[str, Any]:
+    def search(self, topic: str) -> str:
+        """Run several query formulations concurrently and merge their snippets.
+        
+        Each query gets SEARCH_QUERY_TIMEOUT; slow or failed queries are left out
+        rather than delaying the others.
+        """
+        queries = search_queries(topic)
+        deadline = time.monotonic() + settings.SEARCH_QUERY_TIMEOUT
+        futures = [_search_pool.submit(self._search_one, query, deadline) for query in queries]
+        done, not_done = wait(futures, timeout=settings.SEARCH_QUERY_TIMEOUT)
+        # Queued queries are dropped; running ones stop waiting for rate slots at the deadline
+        for future in not_done:
+            future.cancel()
+        
+        results = []
+        for future in futures:
+            if future in not_done:
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                metrics.incr("search.failures")
+                print(f"⚠️ Search query failed: {str(e)}")
+        metrics.incr("search.queries", len(queries))
+        metrics.incr("search.timeouts", len(not_done))
+        return merge_snippets(results)
+    
+    def cached_research(self, topic: str) -> Optional[Dict[str, Any]]:
+        """Most recent research for a topic, if still fresh"""
+        return research_cache.get(research_cache.make_key(topic))
+    
+    def research_topic(self, topic: str, tier: Optional[str] = None, skip_search: bool = False,
+                       timeout: Optional[float] = None) -> Dict[str, Any]:
         """Research a topic using Gemini and return structured insights"""
         
-        # Search for current information
-        search_results = self.search_tool.run(f"{topic} 2024 2025 latest trends")
+        # Search for current information (shared across server workers)
+        if skip_search:
+            search_results = NO_SEARCH_RESULTS
+        else:
+            search_results = self.search(topic) or NO_SEARCH_RESULTS
         
         # Use Gemini to analyze and structure the research
         research_prompt = f"""
@@ -32,36 +149,48 @@ class GeminiResearchAgent:
         
         Search Results:
         {search_results}
+        """
         
+        if self.structured_output:
+            response_schema = RESEARCH_RESPONSE_SCHEMA
+        else:
+            research_prompt += """
         Return your analysis in JSON format with keys: insights, trends, content_angles, debates, tips
         Make sure the JSON is valid and properly formatted.
         """
+            response_schema = None
         
+        # Same search results and prompt give the same analysis, so reuse it across workers
+        analysis_key = llm_cache.make_key("research", self.structured_output, research_prompt)
+        cached_analysis = llm_cache.get(analysis_key)
+        if cached_analysis is not None:
+            metrics.incr("research.llm_cache_hits")
+            return {
+                "research_data": cached_analysis,
+                "raw_search": search_results,
+                "parse_status": "cached",
+                "researched_at": datetime.now().isoformat()
+            }
+        
+        parse_status = "ok"
         try:
-            response = self.model.generate_content(research_prompt)
+            response_text = self.llm.generate(
+                research_prompt, tier=tier, json_schema=response_schema, timeout=timeout
+            )
             
-            # Try to parse as JSON, fallback to structured text
             try:
-                # Extract JSON from response if it's wrapped in markdown
-                content = response.text
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0]
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0]
-                
-                research_data = json.loads(content.strip())
-            except (json.JSONDecodeError, AttributeError):
-                # Fallback structure
-                research_data = {
-                    "insights": [response.text],
-                    "trends": [],
-                    "content_angles": [],
-                    "debates": [],
-                    "tips": []
-                }
+                research_data = self._parse_research(response_text).model_dump()
+                llm_cache.set(analysis_key, research_data)
+            except (JSONOutputError, ValidationError) as e:
+                # Counted rather than hidden, so schema drift shows up in /metrics
+                metrics.incr("research.schema_failures")
+                print(f"⚠️ Research output failed schema validation: {str(e)}")
+                parse_status = "schema_failure"
+                research_data = ResearchData(insights=[response_text]).model_dump()
         
         except Exception as e:
-            print(f"⚠️ Gemini API error: {str(e)}")
+            print(f"⚠️ LLM provider error: {str(e)}")
+            parse_status = "api_error"
             research_data = {
                 "insights": [f"Research topic: {topic}"],
                 "trends": ["AI and technology advancement"],
@@ -70,11 +199,15 @@ class GeminiResearchAgent:
                 "tips": ["Stay updated with latest trends"]
             }
         
-        return {
+        result = {
             "research_data": research_data,
             "raw_search": search_results,
+            "parse_status": parse_status,
             "researched_at": datetime.now().isoformat()
         }
+        if parse_status == "ok" and not skip_search:
+            research_cache.set(research_cache.make_key(topic), result)
+        return result
     
     def extract_key_insights(self, research_data: Dict[str, Any]) -> List[str]:
         """Extract the most important insights for content creation"""
@@ -94,18 +227,42 @@ def gemini_research_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"🔍 Researching topic with Gemini: {topic}")
     
     try:
-        research_results = researcher.research_topic(topic)
+        remaining = remaining_budget(state)
+        research_results = None
+        
+        if budget_below(remaining, settings.BUDGET_SKIP_SEARCH_BELOW):
+            # Short on time: reuse recent research, or skip search and ask the fast model directly
+            research_results = researcher.cached_research(topic)
+            if research_results:
+                print("⏱️ Tight budget: using cached research")
+                metrics.incr("budget.research.cached")
+            else:
+                print("⏱️ Tight budget: skipping web search")
+                metrics.incr("budget.research.search_skipped")
+        
+        if research_results is None:
+            tier = node_tier("research", remaining)
+            skip_search = budget_below(remaining, settings.BUDGET_SKIP_SEARCH_BELOW)
+            research_results = _research_flight.do(
+                (topic, tier, skip_search),
+                lambda: researcher.research_topic(
+                    topic, tier=tier, skip_search=skip_search, timeout=call_timeout(remaining)
+                )
+            )
         key_insights = researcher.extract_key_insights(research_results)
         
         return {
-            **state,
-            "research_data": research_results,
+            # Full results (raw search text included) stay out of state and checkpoints.
+            # Only the stable payload is stored, so runs with the same research share one blob.
+            "research_ref": blob_store.put({
+                "research_data": research_results["research_data"],
+                "raw_search": research_results["raw_search"]
+            }),
             "key_insights": key_insights,
             "status": "researched"
         }
     except Exception as e:
         return {
-            **state,
-            "errors": state.get("errors", []) + [f"Research error: {str(e)}"],
+            "errors": [f"Research error: {str(e)}"],
             "status": "error"
         }
\ No newline at end of file
@@ -1,93 +1,116 @@
 # agents/writer_gemini.py
-import google.generativeai as genai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import re
+from agents.batching import get_llm
+from agents.prompts import shared_context, twitter_task, linkedin_task
+from tools.hashtags import get_hashtag_index
+from tools.metrics import metrics
+from tools.safety import StreamingSafetyGuard, UnsafeContentError, find_violation
 from config.settings import settings
+from tools.text_length import weighted_length, platform_limit, smart_trim
+from workflows.budget import remaining_budget, node_tier, call_timeout
 
 class GeminiContentWriter:
     def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # Calls go through the provider router (Gemini by default, see AI_PROVIDER),
+        # micro-batched with concurrent calls when MICRO_BATCH_ENABLED
+        self.llm = get_llm()
+        self.hashtags = get_hashtag_index()
+        self.stream_guard = settings.SAFETY_STREAM_GUARD and not settings.MICRO_BATCH_ENABLED
     
-    def write_twitter_content(self, topic: str, insights: List[str], content_type: str = "educational") -> Dict[str, Any]:
+    def _stream_draft(self, task: str, tier: Optional[str], timeout: Optional[float],
+                      context: Optional[str]) -> Tuple[str, Optional[str]]:
+        """Stream one draft through the safety rules, cancelling it at the first violation"""
+        guard = StreamingSafetyGuard()
+        chunks = self.llm.stream(task, tier=tier, timeout=timeout, context=context)
+        try:
+            for chunk in chunks:
+                if guard.feed(chunk):
+                    metrics.incr("safety.streams_aborted")
+                    return guard.text, guard.violation
+        finally:
+            chunks.close()
+        return guard.text, guard.finish()
+    
+    def _generate_safe(self, task: str, tier: Optional[str] = None, timeout: Optional[float] = None,
+                       context: Optional[str] = None) -> str:
+        """Generate a draft that passes the safety rules, trying up to SAFETY_MAX_CANDIDATES"""
+        for attempt in range(settings.SAFETY_MAX_CANDIDATES):
+            if self.stream_guard:
+                text, violation = self._stream_draft(task, tier, timeout, context)
+            else:
+                text = self.llm.generate(task, tier=tier, timeout=timeout, context=context)
+                violation = find_violation(text)
+            if not violation:
+                return text.strip()
+            metrics.incr("safety.drafts_rejected")
+            print(f"⚠️ Draft {attempt + 1} rejected: {violation}")
+            # Steer the next candidate away from what went wrong
+            task += f"\n- A previous draft was rejected ({violation}); keep it positive and avoid that subject"
+        raise UnsafeContentError(f"No safe draft after {settings.SAFETY_MAX_CANDIDATES} candidates")
+    
+    def _hashtag_hint(self, proven_tags: List[str]) -> str:
+        """Prompt line seeding the writer with hashtags that worked for similar topics"""
+        if not proven_tags:
+            return ""
+        return f"- Prefer these proven hashtags where relevant: {' '.join(proven_tags)}"
+    
+    def _fit_length(self, text: str, platform: str) -> str:
+        """Trim over-length output locally instead of asking the model to rewrite it"""
+        if weighted_length(text, platform) <= platform_limit(platform):
+            return text
+        metrics.incr(f"length.trimmed.{platform}")
+        return smart_trim(text, platform)
+    
+    def write_twitter_content(self, topic: str, insights: List[str], content_type: str = "educational",
+                              tier: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
         """Write Twitter-specific content using Gemini"""
         
-        insights_text = "\n".join([f"• {insight}" for insight in insights[:3]])
-        
-        twitter_prompt = f"""
-        Write engaging Twitter content about "{topic}".
-        
-        Key insights to include:
-        {insights_text}
-        
-        Content type: {content_type}
-        
-        Requirements:
-        - Maximum 280 characters
-        - Engaging hook in first line
-        - Include 2-3 relevant hashtags
-        - Call to action or question at the end
-        - Professional but conversational tone
-        
-        Return ONLY the tweet text, nothing else.
-        """
+        # Shared with the LinkedIn writer, so cached providers read it only once per run
+        context = shared_context(topic, insights)
+        proven_tags = self.hashtags.suggest(topic, k=5)
         
         try:
-            response = self.model.generate_content(twitter_prompt)
-            tweet = response.text.strip()
+            tweet = self._generate_safe(
+                twitter_task(content_type, self._hashtag_hint(proven_tags)), tier=tier, timeout=timeout, context=context
+            )
+            tweet = self._fit_length(tweet, "twitter")
             
-            # Extract hashtags
+            # Extract hashtags (after trimming, so dropped tags aren't reported)
             hashtags = re.findall(r'#\w+', tweet)
             
             return {
                 "content": tweet,
                 "hashtags": hashtags,
-                "character_count": len(tweet),
+                "character_count": weighted_length(tweet, "twitter"),
                 "platform": "twitter"
             }
         except Exception as e:
             print(f"⚠️ Gemini Twitter writing error: {str(e)}")
-            # Fallback content
+            # Fallback content, tagged from history when possible
+            hashtags = proven_tags[:3] or ["#AI", "#Tech", "#Innovation"]
+            tweet = self._fit_length(f"Exploring {topic} - fascinating insights ahead! What are your thoughts? {' '.join(hashtags)}", "twitter")
             return {
-                "content": f"Exploring {topic} - fascinating insights ahead! What are your thoughts? #AI #Tech #Innovation",
-                "hashtags": ["#AI", "#Tech", "#Innovation"],
-                "character_count": 80,
-                "platform": "twitter"
+                "content": tweet,
+                "hashtags": hashtags,
+                "character_count": weighted_length(tweet, "twitter"),
+                "platform": "twitter",
+                "fallback": True  # stock text and tags, kept out of the hashtag index
             }
     
-    def write_linkedin_content(self, topic: str, insights: List[str], content_type: str = "educational") -> Dict[str, Any]:
+    def write_linkedin_content(self, topic: str, insights: List[str], content_type: str = "educational",
+                               tier: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
         """Write LinkedIn-specific content using Gemini"""
         
-        insights_text = "\n".join([f"• {insight}" for insight in insights])
-        
-        linkedin_prompt = f"""
-        Write professional LinkedIn content about "{topic}".
-        
-        Key insights to include:
-        {insights_text}
-        
-        Content type: {content_type}
-        
-        Requirements:
-        - 500-1500 characters (LinkedIn sweet spot)
-        - Professional tone but accessible
-        - Strong opening hook
-        - Bullet points or numbered lists when appropriate
-        - Call to action encouraging engagement
-        - 3-5 relevant hashtags at the end
-        - Include a thought-provoking question
-        
-        Structure:
-        1. Hook/Opening statement
-        2. Main insights (use bullet points)
-        3. Personal take or conclusion
-        4. Call to action question
-        5. Hashtags
-        """
+        context = shared_context(topic, insights)
+        proven_tags = self.hashtags.suggest(topic, k=5)
         
         try:
-            response = self.model.generate_content(linkedin_prompt)
-            post = response.text.strip()
+            post = self._generate_safe(
+                linkedin_task(content_type, self._hashtag_hint(proven_tags)), tier=tier, timeout=timeout, context=context
+            )
+            post = self._fit_length(post, "linkedin")
             
             # Extract hashtags
             hashtags = re.findall(r'#\w+', post)
@@ -95,17 +118,20 @@ class GeminiContentWriter:
             return {
                 "content": post,
                 "hashtags": hashtags,
-                "character_count": len(post),
+                "character_count": weighted_length(post, "linkedin"),
                 "platform": "linkedin"
             }
         except Exception as e:
             print(f"⚠️ Gemini LinkedIn writing error: {str(e)}")
-            # Fallback content
+            # Fallback content, tagged from history when possible
+            hashtags = proven_tags[:3] or ["#Professional", "#Innovation", "#Technology"]
+            post = f"Diving deep into {topic} today.\n\nKey takeaway: The landscape is evolving rapidly, and staying informed is crucial.\n\nWhat's your experience with this? Share your thoughts below!\n\n{' '.join(hashtags)}"
             return {
-                "content": f"Diving deep into {topic} today.\n\nKey takeaway: The landscape is evolving rapidly, and staying informed is crucial.\n\nWhat's your experience with this? Share your thoughts below!\n\n#Professional #Innovation #Technology",
-                "hashtags": ["#Professional", "#Innovation", "#Technology"],
-                "character_count": 200,
-                "platform": "linkedin"
+                "content": post,
+                "hashtags": hashtags,
+                "character_count": weighted_length(post, "linkedin"),
+                "platform": "linkedin",
+                "fallback": True  # stock text and tags, kept out of the hashtag index
             }
 
 # LangGraph node functions for Gemini
@@ -120,18 +146,21 @@ def gemini_write_twitter_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"✍️ Writing Twitter content with Gemini for: {topic}")
     
     try:
-        twitter_result = writer.write_twitter_content(topic, insights, content_type)
+        remaining = remaining_budget(state)
+        twitter_result = writer.write_twitter_content(
+            topic, insights, content_type,
+            tier=node_tier("write_twitter", remaining), timeout=call_timeout(remaining)
+        )
         
         return {
-            **state,
             "twitter_content": twitter_result["content"],
             "hashtags": twitter_result["hashtags"],
+            "hashtags_fallback": twitter_result.get("fallback", False),
             "status": "twitter_written"
         }
     except Exception as e:
         return {
-            **state,
-            "errors": state.get("errors", []) + [f"Twitter writing error: {str(e)}"],
+            "errors": [f"Twitter writing error: {str(e)}"],
             "status": "error"
         }
 
@@ -146,16 +175,74 @@ def gemini_write_linkedin_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"✍️ Writing LinkedIn content with Gemini for: {topic}")
     
     try:
-        linkedin_result = writer.write_linkedin_content(topic, insights, content_type)
+        remaining = remaining_budget(state)
+        linkedin_result = writer.write_linkedin_content(
+            topic, insights, content_type,
+            tier=node_tier("write_linkedin", remaining), timeout=call_timeout(remaining)
+        )
         
         return {
-            **state,
             "linkedin_content": linkedin_result["content"],
             "status": "linkedin_written"
         }
     except Exception as e:
         return {
-            **state,
-            "errors": state.get("errors", []) + [f"LinkedIn writing error: {str(e)}"],
+            "errors": [f"LinkedIn writing error: {str(e)}"],
             "status": "error"
-        }
\ No newline at end of file
+        }
+
+def gemini_write_variants_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """LangGraph node writing every (platform, content type) variant from one research pass"""
+    writer = GeminiContentWriter()
+    
+    topic = state["topic"]
+    insights = state.get("key_insights", [])
+    content_types = state.get("content_types") or [state.get("content_type", "educational")]
+    platforms = [p for p in state.get("target_platforms", []) if p in ("twitter", "linkedin")] or ["twitter"]
+    
+    print(f"✍️ Writing {len(platforms) * len(content_types)} variants with Gemini for: {topic}")
+    
+    try:
+        remaining = remaining_budget(state)
+        timeout = call_timeout(remaining)
+        write = {"twitter": writer.write_twitter_content, "linkedin": writer.write_linkedin_content}
+        jobs = [(platform, content_type) for content_type in content_types for platform in platforms]
+        
+        # Writers are independent; the provider router and rate limiter bound the real concurrency
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {
+                (platform, content_type): pool.submit(
+                    write[platform], topic, insights, content_type,
+                    tier=node_tier(f"write_{platform}", remaining), timeout=timeout
+                )
+                for platform, content_type in jobs
+            }
+            results = {job: future.result() for job, future in futures.items()}
+        
+        variants: Dict[str, Dict[str, str]] = {}
+        hashtags: List[str] = []
+        for (platform, content_type), result in results.items():
+            variants.setdefault(content_type, {})[platform] = result["content"]
+            # Stock tags from a failed writer are left out whenever another writer chose real ones
+            if not result.get("fallback"):
+                hashtags += [tag for tag in result["hashtags"] if tag not in hashtags]
+        hashtags_fallback = not hashtags
+        if hashtags_fallback:
+            for result in results.values():
+                hashtags += [tag for tag in result["hashtags"] if tag not in hashtags]
+        
+        # The first content type doubles as the regular single-variant output
+        primary = variants[content_types[0]]
+        return {
+            "variants": variants,
+            "twitter_content": primary.get("twitter"),
+            "linkedin_content": primary.get("linkedin"),
+            "hashtags": hashtags,
+            "hashtags_fallback": hashtags_fallback,
+            "status": "variants_written"
+        }
+    except Exception as e:
+        return {
+            "errors": [f"Variant writing error: {str(e)}"],
+            "status": "error"
+        }
@@ -0,0 +1,189 @@
+# bulk_generate.py
+"""
+Resumable bulk content generation.
+Reads topics from a CSV or JSONL file of any size, generates content with a
+bounded pool of concurrent workers and appends each result to a JSONL file as
+soon as it finishes. Rerunning with the same output file skips completed rows.
+
+Usage:
+    python bulk_generate.py topics.csv -o generated_content/bulk.jsonl --workers 8
+    python bulk_generate.py plan.jsonl --safe
+
+Input rows need a "topic" and may set "id", "platforms" (comma-separated in
+CSV) and "content_type".
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, Set
+
+DEFAULT_OUTPUT = "generated_content/bulk_results.jsonl"
+
+
+def row_id(index: int, row: Dict[str, Any]) -> str:
+    """Stable id for an input row: its own id, or line number plus topic hash"""
+    if row.get("id"):
+        return str(row["id"])
+    digest = hashlib.sha1(row["topic"].encode("utf-8")).hexdigest()[:8]
+    return f"{index}-{digest}"
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream normalized rows from a CSV or JSONL file without loading it all"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+
+        for index, record in enumerate(records, 1):
+            topic = (record.get("topic") or "").strip()
+            if not topic:
+                continue
+            platforms = record.get("platforms") or ["twitter"]
+            if isinstance(platforms, str):
+                platforms = [p.strip() for p in platforms.split(",") if p.strip()]
+            row = {
+                "topic": topic,
+                "platforms": platforms,
+                "content_type": record.get("content_type") or "educational",
+                "id": record.get("id")
+            }
+            row["id"] = row_id(index, row)
+            yield row
+
+
+def ends_mid_line(output_path: str) -> bool:
+    """True if the file's last line has no newline (a write cut short by a crash)"""
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return False
+    with open(output_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids already written successfully to the output file"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from a crash
+            if record.get("status") == "completed":
+                done.add(record["id"])
+    return done
+
+
+class BulkGenerator:
+    """Bounded worker pool that streams results to JSONL"""
+
+    def __init__(self, output_path: str = DEFAULT_OUTPUT, workers: int = 4, safe: bool = False):
+        self.output_path = output_path
+        self.workers = workers
+        self.safe = safe
+        self.stats = {"completed": 0, "failed": 0, "skipped": 0}
+
+        if safe:
+            from twitter_automation import SafeTwitterAutomation
+            self.automation = SafeTwitterAutomation()
+        else:
+            from workflows.content_pipeline import GeminiContentPipeline
+            self.pipeline = GeminiContentPipeline()
+
+    async def _generate(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        record = {
+            "id": row["id"],
+            "topic": row["topic"],
+            "platforms": row["platforms"],
+            "content_type": row["content_type"]
+        }
+        try:
+            if self.safe:
+                result = await self.automation.generate_safe_content(
+                    row["topic"], platforms=row["platforms"], content_type=row["content_type"]
+                ) or {
+                    "status": "error", "errors": ["No safe content after all attempts"]
+                }
+            else:
+                result = await self.pipeline.create_content(row["topic"], row["platforms"], row["content_type"])
+        except Exception as e:
+            result = {"status": "error", "errors": [str(e)]}
+
+        failed = result.get("status") == "error"
+        record.update({
+            "status": "error" if failed else "completed",
+            "twitter": result.get("final_twitter"),
+            "linkedin": result.get("final_linkedin"),
+            "hashtags": result.get("hashtags", []),
+            "run_id": result.get("run_id"),
+            "errors": result.get("errors", []),
+            "generated_at": datetime.now().isoformat()
+        })
+        return record
+
+    async def _worker(self, queue: asyncio.Queue, out):
+        while True:
+            row = await queue.get()
+            if row is None:
+                queue.task_done()
+                return
+            record = await self._generate(row)
+            # One complete line per result, flushed so a crash loses at most in-flight rows
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            self.stats["completed" if record["status"] == "completed" else "failed"] += 1
+            print(f"{'✅' if record['status'] == 'completed' else '❌'} [{record['id']}] {row['topic']}")
+            queue.task_done()
+
+    async def run(self, input_path: str) -> Dict[str, int]:
+        """Process every row not already completed in the output file"""
+        done = completed_ids(self.output_path)
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+
+        # Small queue keeps memory flat regardless of input size
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            if ends_mid_line(self.output_path):
+                # Keep the first new result off the partial line, or it would be unreadable too
+                out.write("\n")
+            workers = [asyncio.create_task(self._worker(queue, out)) for _ in range(self.workers)]
+
+            for row in read_rows(input_path):
+                if row["id"] in done:
+                    self.stats["skipped"] += 1
+                    continue
+                await queue.put(row)
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate content for many topics from a CSV or JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file with a 'topic' column/field")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="JSONL results file (appended, used for resume)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="concurrent generations")
+    parser.add_argument("--safe", action="store_true", help="validate every platform's post for safety, regenerating rejected rows")
+    args = parser.parse_args()
+
+    print(f"📅 Bulk generating from {args.input} with {args.workers} workers")
+    generator = BulkGenerator(args.output, args.workers, args.safe)
+    stats = asyncio.run(generator.run(args.input))
+
+    print(f"\n📄 Results appended to: {args.output}")
+    print(f"✅ {stats['completed']} completed, ❌ {stats['failed']} failed, ⏭️ {stats['skipped']} already done")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,15 @@ load_dotenv()
 
 class Settings:
     # AI Provider Selection
-    AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini")  # "openai" or "gemini"
+    AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini")  # "gemini", "openai" or "stub"
+    # Providers the router may fail over to, e.g. "gemini,openai" (default: AI_PROVIDER only)
+    LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "").split(",") if p.strip()]
     
-    # OpenAI (Optional)
+    # OpenAI (Optional) - also any OpenAI-compatible server via OPENAI_BASE_URL
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # e.g. http://localhost:11434/v1
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", OPENAI_MODEL)
     
     # Gemini (Google AI) - Make sure this is loaded
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -26,9 +31,136 @@ class Settings:
     MAX_LINKEDIN_LENGTH = 3000
     
     # Model Settings
-    DEFAULT_MODEL = "gemini-1.5-flash"  # Updated model name
-    RESEARCH_MODEL = "gemini-1.5-flash"  # Updated model name
+    DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gemini-1.5-flash")  # Updated model name
+    RESEARCH_MODEL = os.getenv("RESEARCH_MODEL", "gemini-1.5-flash")  # Updated model name
+    FAST_MODEL = os.getenv("FAST_MODEL", "gemini-1.5-flash-8b")  # used when a request is short on time
     
+    # Concrete model for each tier, per provider
+    MODEL_TIERS = {
+        "gemini": {"standard": DEFAULT_MODEL, "research": RESEARCH_MODEL, "fast": FAST_MODEL},
+        "openai": {"standard": OPENAI_MODEL, "research": OPENAI_MODEL, "fast": OPENAI_FAST_MODEL},
+        "stub": {"standard": "stub", "research": "stub", "fast": "stub"}
+    }
+    # Tier used by each pipeline node when the request has time to spare
+    NODE_MODEL_TIERS = {
+        "research": os.getenv("RESEARCH_NODE_TIER", "research"),
+        "write_twitter": os.getenv("TWITTER_NODE_TIER", "standard"),
+        "write_linkedin": os.getenv("LINKEDIN_NODE_TIER", "standard")
+    }
+    
+    # Request latency budget (seconds); requests may set their own
+    DEFAULT_LATENCY_BUDGET = float(os.getenv("DEFAULT_LATENCY_BUDGET", "0")) or None
+    BUDGET_FAST_TIER_BELOW = 8.0  # switch nodes to the fast tier
+    BUDGET_SKIP_SEARCH_BELOW = 5.0  # research from cache or model knowledge only
+    MIN_CALL_TIMEOUT = 1.0
+    # Ask the model for schema-constrained JSON instead of prose-wrapped JSON
+    RESEARCH_STRUCTURED_OUTPUT = os.getenv("RESEARCH_STRUCTURED_OUTPUT", "true").lower() == "true"
+    # Research search fan-out: query formulations run concurrently, results merged
+    SEARCH_QUERY_COUNT = int(os.getenv("SEARCH_QUERY_COUNT", "2"))  # each topic uses this many SEARCH_RPM slots
+    SEARCH_QUERY_TIMEOUT = float(os.getenv("SEARCH_QUERY_TIMEOUT", "8"))  # seconds per query
+    SEARCH_MAX_CHARS = int(os.getenv("SEARCH_MAX_CHARS", "6000"))  # merged snippets sent to the model
+    # Shared writer context (research + instructions) sent once as a cacheable prefix
+    CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", "600"))  # seconds
+    # Smallest context worth an explicit Gemini cache, in tokens (Gemini 2.x minimum is 1024-4096 by model).
+    # Writer contexts are usually smaller; those rely on Gemini's implicit caching of the repeated prefix.
+    CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "4096"))
+
+    # Pipeline checkpoints (resume failed runs from the last completed node)
+    CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "generated_content/checkpoints.sqlite")
+    CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", "604800"))  # seconds since a run last ran before its checkpoints are deleted
+    STORE_PURGE_INTERVAL = float(os.getenv("STORE_PURGE_INTERVAL", "3600"))  # seconds between purges of expired cache entries and old checkpoints
+
+    # Shared cross-process caches (SQLite WAL)
+    CACHE_DB = os.getenv("CACHE_DB", "generated_content/cache.sqlite")
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))  # seconds
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))  # seconds
+    BLOB_TTL = float(os.getenv("BLOB_TTL", "604800"))  # large state values referenced from checkpoints
+    RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", "21600"))  # last research per topic, for tight budgets
+
+    # Provider rate limits (upper bounds; AIMD adapts below them when throttled).
+    # They apply per process: N server workers can send up to N x GEMINI_RPM in total.
+    RATE_LIMITS = {
+        "gemini": {
+            "rpm": float(os.getenv("GEMINI_RPM", "15")),
+            "max_concurrency": int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+        },
+        "duckduckgo": {
+            "rpm": float(os.getenv("SEARCH_RPM", "60")),
+            "max_concurrency": int(os.getenv("SEARCH_MAX_CONCURRENCY", "4"))
+        },
+        "openai": {
+            "rpm": float(os.getenv("OPENAI_RPM", "60")),
+            "max_concurrency": int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+        },
+        "stub": {"rpm": 60000.0, "max_concurrency": 64},
+        "default": {"rpm": 60.0, "max_concurrency": 4}
+    }
+    RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+
+    # Model call deadlines, hedging and circuit breaking
+    MODEL_CALL_TIMEOUT = float(os.getenv("MODEL_CALL_TIMEOUT", "30"))  # seconds per call
+    MODEL_CALL_POOL_SIZE = int(os.getenv("MODEL_CALL_POOL_SIZE", "16"))
+    HEDGE_MIN_SAMPLES = 20  # latencies observed before hedging at p95
+    HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))  # at most 10% extra calls
+    BREAKER_WINDOW = 60  # seconds of outcomes considered
+    BREAKER_MIN_CALLS = 10
+    BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+    BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))  # seconds before probing again
+    
+    # Opt-in micro-batching: concurrent writer/research calls share one multi-item prompt
+    MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+    MICRO_BATCH_WINDOW = float(os.getenv("MICRO_BATCH_WINDOW_MS", "50")) / 1000  # seconds to collect a batch
+    MICRO_BATCH_MAX_ITEMS = int(os.getenv("MICRO_BATCH_MAX_ITEMS", "8"))
+    MICRO_BATCH_TIMEOUT_PER_ITEM = float(os.getenv("MICRO_BATCH_TIMEOUT_PER_ITEM", "0.5"))  # extra share of a call's timeout per batched item
+    # Writers stream through the safety rules and abort unsafe drafts early
+    # (micro-batched calls can't stream; their drafts are checked when complete)
+    SAFETY_STREAM_GUARD = os.getenv("SAFETY_STREAM_GUARD", "true").lower() == "true"
+    SAFETY_MAX_CANDIDATES = int(os.getenv("SAFETY_MAX_CANDIDATES", "3"))
+
+    # API server
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "120"))  # seconds to finish in-flight requests
+    SERVER_WORKER_TIMEOUT = int(os.getenv("SERVER_WORKER_TIMEOUT", "300"))  # seconds before a stuck worker is restarted
+    # Idempotency-Key support for POST /create-content
+    IDEMPOTENCY_DB = os.getenv("IDEMPOTENCY_DB", CACHE_DB)
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))  # seconds a stored result is replayed
+    IDEMPOTENCY_POLL_INTERVAL = 0.25  # seconds between checks on a run owned by another worker
+    # Startup warm-up gating /ready
+    WARMUP_MODEL_CALL = os.getenv("WARMUP_MODEL_CALL", "true").lower() == "true"
+    WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))  # seconds for the warm-up model call
+
+    # Pipeline profiling (per request via X-Profile header or ?profile=true, or every run)
+    PROFILE_ALL_RUNS = os.getenv("PROFILE_PIPELINE", "false").lower() == "true"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "generated_content/profiles")
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))  # sampling interval, seconds
+
+    # Content Inventory (pre-generated posts for instant posting)
+    INVENTORY_DB = os.getenv("INVENTORY_DB", "generated_content/inventory.sqlite")
+    INVENTORY_TARGET_PER_TOPIC = int(os.getenv("INVENTORY_TARGET_PER_TOPIC", "3"))
+    INVENTORY_REFILL_INTERVAL = float(os.getenv("INVENTORY_REFILL_INTERVAL", "300"))  # seconds
+
+    # Multi-account posting (one browser profile and worker per account)
+    POSTING_ACCOUNTS = [a.strip() for a in os.getenv("POSTING_ACCOUNTS", "").split(",") if a.strip()]
+    POSTING_PROFILES_DIR = os.getenv("POSTING_PROFILES_DIR", "~/chrome_twitter_profiles")
+    # Lean browser sessions: eager page load, blocked media/fonts/trackers, direct compose URLs
+    BROWSER_LEAN_MODE = os.getenv("BROWSER_LEAN_MODE", "false").lower() == "true"
+
+    # Email digests (disabled unless SMTP_HOST is set; DIGEST_RECIPIENTS are the default recipients)
+    SMTP_HOST = os.getenv("SMTP_HOST", "")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USER = os.getenv("SMTP_USER")
+    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+    SMTP_FROM = os.getenv("SMTP_FROM")
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    DIGEST_RECIPIENTS = [r.strip() for r in os.getenv("DIGEST_RECIPIENTS", "").split(",") if r.strip()]
+    DIGEST_INTERVAL = float(os.getenv("DIGEST_INTERVAL", "900"))  # seconds between digests (each server worker sends its own)
+    DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "50"))  # send early once this many are queued
+    DIGEST_MAX_ATTEMPTS = int(os.getenv("DIGEST_MAX_ATTEMPTS", "3"))  # failed sends before an item is dropped
+
     def __init__(self):
         # Debug: Check if API key is loaded
         if not self.GEMINI_API_KEY:
@@ -6,8 +6,8 @@ No API keys required for posting!
 import asyncio
 import os
 from workflows.content_pipeline import ContentPipeline
-from tools.alternative_posting import AlternativePostingManager
-from tools.free_automation import FreeAutomationTools
+from tools.posting import AlternativePostingManager
+from tools.automation import FreeAutomationTools
 from tools.browser_automation import BrowserPoster
 
 class FreeSocialMediaEngine:
@@ -44,6 +44,14 @@ class FreeSocialMediaEngine:
         # Handle posting based on method
         await self._handle_posting(content, topic, posting_method)
         
+        # The pipeline queues the content for the email digest when SMTP and recipients
+        # are set up; otherwise save an email-ready summary file
+        if result.get("email_queued"):
+            print("📧 Email summary: queued for the next email digest")
+        else:
+            email_file = self.automation_tools.send_email_summary(content, topic)
+            print(f"📧 Email summary: {email_file}")
+        
         return result
     
     async def _handle_posting(self, content: dict, topic: str, method: str):
@@ -94,10 +102,6 @@ class FreeSocialMediaEngine:
                 print("💡 Set DISCORD_WEBHOOK_URL or ZAPIER_WEBHOOK_URL in .env for webhook posting")
                 # Fallback to manual
                 await self._handle_posting(content, topic, "manual")
-        
-        # Always create email summary
-        email_file = self.automation_tools.send_email_summary(content, topic)
-        print(f"📧 Email summary: {email_file}")
 
 async def main():
     """Interactive main function"""
@@ -1,18 +1,61 @@
 # main.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Response
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from workflows.content_pipeline import ContentPipeline
 from workflows.state import PostRequest, PostResponse
+from tools.metrics import metrics
+from tools.profiling import find_profile
+from tools.idempotency import get_idempotency_store, request_fingerprint, IdempotencyConflict
+from config.settings import settings
+from workflows.warmup import warm_up, warmup_status, purge_stores
+
+# Built during warm-up; the first request builds it if warm-up hasn't yet
+pipeline: Optional[ContentPipeline] = None
+
+def get_pipeline() -> ContentPipeline:
+    global pipeline
+    if pipeline is None:
+        pipeline = ContentPipeline()
+    return pipeline
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background so /health answers while /ready reports warming"""
+    loop = asyncio.get_running_loop()
+    
+    async def run_warm_up():
+        global pipeline
+        built = await loop.run_in_executor(None, warm_up, ContentPipeline)
+        pipeline = pipeline or built
+    
+    async def purge_periodically():
+        # Warm-up purges once; after that, expired entries and old checkpoints are cleared on a timer
+        while True:
+            await asyncio.sleep(settings.STORE_PURGE_INTERVAL)
+            try:
+                await loop.run_in_executor(None, purge_stores)
+            except Exception as e:
+                print(f"⚠️ Store purge failed: {str(e)}")
+    
+    warm_up_task = asyncio.create_task(run_warm_up())
+    purge_task = asyncio.create_task(purge_periodically())
+    yield
+    purge_task.cancel()
+    if not warm_up_task.done():
+        warm_up_task.cancel()
 
 app = FastAPI(
     title="AI Social Media Content Engine",
     description="Create engaging social media content using AI agents",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -24,9 +67,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the content pipeline
-pipeline = ContentPipeline()
-
 @app.get("/")
 async def root():
     return {
@@ -34,46 +74,85 @@ async def root():
         "status": "running",
         "endpoints": {
             "create_content": "/create-content",
-            "health": "/health"
+            "health": "/health",
+            "ready": "/ready",
+            "metrics": "/metrics",
+            "profiles": "/debug/profiles/{run_id}"
         }
     }
 
+async def _create(request: PostRequest, profile: bool) -> PostResponse:
+    """Run the content pipeline for one request"""
+    print(f"📝 Received request: {request.topic} for {request.platforms}")
+    
+    # Run the content creation pipeline
+    result = await get_pipeline().create_content(
+        topic=request.topic,
+        platforms=request.platforms,
+        content_type=request.content_type,
+        run_id=request.run_id,
+        latency_budget=request.latency_budget_ms / 1000 if request.latency_budget_ms else None,
+        content_types=request.content_types,
+        profile=profile
+    )
+    
+    if result.get("status") == "error":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Content creation failed",
+                "errors": result.get("errors", []),
+                # Retry with this run_id to resume from the last completed step
+                "run_id": result.get("run_id")
+            }
+        )
+    
+    # Format response
+    content = {}
+    if result.get("final_twitter"):
+        content["twitter"] = result["final_twitter"]
+    if result.get("final_linkedin"):
+        content["linkedin"] = result["final_linkedin"]
+    
+    return PostResponse(
+        success=True,
+        message="Content created successfully!",
+        content=content,
+        variants=result.get("variants"),
+        run_id=result.get("run_id"),
+        profile_url=f"/debug/profiles/{result['run_id']}" if result.get("profile_files") else None
+    )
+
 @app.post("/create-content", response_model=PostResponse)
-async def create_content(request: PostRequest):
+async def create_content(
+    request: PostRequest,
+    response: Response,
+    profile: bool = Query(False, description="record a sampling profile of this run"),
+    x_profile: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, description="retries with the same key get the original result")
+):
     """Create social media content for given topic"""
     
+    profile = profile or (x_profile or "").lower() in ("1", "true", "yes")
+    
     try:
-        print(f"📝 Received request: {request.topic} for {request.platforms}")
-        
-        # Run the content creation pipeline
-        result = await pipeline.create_content(
-            topic=request.topic,
-            platforms=request.platforms,
-            content_type=request.content_type
-        )
+        if not idempotency_key:
+            return await _create(request, profile)
         
-        if result.get("status") == "error":
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "message": "Content creation failed",
-                    "errors": result.get("errors", [])
-                }
-            )
+        async def run():
+            return (await _create(request, profile)).model_dump()
         
-        # Format response
-        content = {}
-        if result.get("final_twitter"):
-            content["twitter"] = result["final_twitter"]
-        if result.get("final_linkedin"):
-            content["linkedin"] = result["final_linkedin"]
-        
-        return PostResponse(
-            success=True,
-            message="Content created successfully!",
-            content=content
+        data, replayed = await get_idempotency_store().execute(
+            idempotency_key, request_fingerprint(request.model_dump()), run
         )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return PostResponse(**data)
         
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ API Error: {str(e)}")
         raise HTTPException(
@@ -90,12 +169,33 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until this worker has warmed up (and for good if a required step failed)"""
+    if not warmup_status.ready:
+        return JSONResponse(status_code=503, content=warmup_status.to_dict())
+    return warmup_status.to_dict()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Current counters and gauges from agents and tools"""
+    return metrics.snapshot()
+
+@app.get("/debug/profiles/{run_id}")
+async def get_profile(run_id: str, format: str = "speedscope"):
+    """Saved profile of a run: speedscope JSON (open at speedscope.app) or format=html"""
+    path = find_profile(run_id, format)
+    if not path:
+        raise HTTPException(status_code=404, detail=f"No {format} profile for run {run_id}")
+    media_type = "text/html" if format == "html" else "application/json"
+    return FileResponse(path, media_type=media_type)
+
 # Test endpoint
 @app.post("/test")
 async def test_pipeline(topic: str = "artificial intelligence"):
     """Test the pipeline with a simple topic"""
     try:
-        result = await pipeline.create_content(
+        result = await get_pipeline().create_content(
             topic=topic,
             platforms=["twitter"],
             content_type="educational"
@@ -104,6 +204,55 @@ async def test_pipeline(topic: str = "artificial intelligence"):
     except Exception as e:
         return {"error": str(e)}
 
-if __name__ == "__main__":
+def serve(workers: int = None, host: str = None, port: int = None):
+    """Run the API server.
+    
+    With more than one worker, gunicorn pre-forks uvicorn workers that share the
+    SQLite caches and checkpoints. Send SIGHUP to the master for a graceful reload:
+    new workers start and old ones finish in-flight requests before exiting.
+    """
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    
+    workers = workers or settings.SERVER_WORKERS
+    host = host or settings.SERVER_HOST
+    port = port or settings.SERVER_PORT
+    
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port, timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT)
+        return
+    
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # gunicorn is not available on Windows: uvicorn's own supervisor, without graceful reloads
+        print("💡 Install gunicorn for pre-forked workers with graceful reloads")
+        uvicorn.run("main:app", host=host, port=port, workers=workers,
+                    timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT)
+        return
+    
+    class PreforkServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("graceful_timeout", settings.SERVER_GRACEFUL_TIMEOUT)
+            self.cfg.set("timeout", settings.SERVER_WORKER_TIMEOUT)
+            # Each worker builds its own pipeline and database connections after the fork
+            self.cfg.set("preload_app", False)
+        
+        def load(self):
+            return app
+    
+    print(f"🚀 Starting {workers} workers on {host}:{port}")
+    PreforkServer().run()
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="AI Social Media Content Engine API server")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--host", help="bind address")
+    parser.add_argument("--port", type=int, help="bind port")
+    args = parser.parse_args()
+    
+    serve(args.workers, args.host, args.port)
\ No newline at end of file
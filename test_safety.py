@@ -0,0 +1,53 @@
+# test_safety.py
+from tools.safety import StreamingSafetyGuard, find_violation
+
+# Must be rejected: banned words inside longer words count too
+UNSAFE = [
+    "A deadly storm is heading for the coast",
+    "Hackers and attackers breached the network overnight",
+    "Police arrested the murderer this morning",
+    "Killing it with these 5 productivity hacks #Tips",
+    "Three tragedies that changed aviation forever",
+    "BREAKING: 279 dead after plane crash",
+]
+
+# Must pass: allowed phrases that contain a banned word
+SAFE = [
+    "Meeting deadlines without burning out #Productivity",
+    "A crash course in Python for beginners",
+    "Your weekly deadlift routine, simplified",
+    "5 remote work tips that actually help #RemoteWork",
+    "Upskilling: the skills employers want in 2025",
+]
+
+
+def stream(text: str, chunk_size: int = 3):
+    """Feed text to a streaming guard in small chunks; returns the violation if any"""
+    guard = StreamingSafetyGuard()
+    for i in range(0, len(text), chunk_size):
+        if guard.feed(text[i:i + chunk_size]):
+            return guard.violation
+    return guard.finish()
+
+
+def test_unsafe_content_is_rejected():
+    for text in UNSAFE:
+        assert find_violation(text), f"not rejected: {text}"
+        assert stream(text), f"not rejected when streamed: {text}"
+
+
+def test_allowed_phrases_pass():
+    for text in SAFE:
+        assert find_violation(text) is None, f"rejected: {text} ({find_violation(text)})"
+        assert stream(text) is None, f"rejected when streamed: {text}"
+
+
+if __name__ == "__main__":
+    print("🛡️ Testing content safety rules")
+    for text in UNSAFE:
+        print(f"{'✅' if find_violation(text) and stream(text) else '❌'} rejected: {text}")
+    for text in SAFE:
+        print(f"{'✅' if find_violation(text) is None and stream(text) is None else '❌'} allowed: {text}")
+    test_unsafe_content_is_rejected()
+    test_allowed_phrases_pass()
+    print("🎉 All safety checks passed")
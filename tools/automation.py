@@ -104,8 +104,20 @@ class FreeAutomationTools:
         print(f"📄 IFTTT trigger file created: {filename}")
         return filename
     
+    def queue_email_digest(self, content: Dict, topic: str, email: Optional[str] = None) -> bool:
+        """Queue content for the next email digest (SMTP_HOST, optional DIGEST_RECIPIENTS)"""
+        from tools.email_digest import get_digest_sender
+        
+        digest = get_digest_sender()
+        if not digest:
+            return False
+        return digest.enqueue(content, topic, [email] if email else None)
+    
     def send_email_summary(self, content: Dict, topic: str, email: Optional[str] = None) -> str:
-        """Generate email-ready summary"""
+        """Queue content for the email digest, or save an email-ready summary file if email isn't set up"""
+        if self.queue_email_digest(content, topic, email):
+            return "queued for the next email digest"
+        
         email_body = f"""
 Subject: 📝 New Social Media Content Generated: {topic}
 
@@ -0,0 +1,35 @@
+# tools/blob_store.py
+"""
+Side store for large pipeline values (raw search text, full research JSON).
+Workflow state carries only a short reference, which keeps checkpoints and
+API responses small. Blobs are content-addressed, so identical research
+stored by several runs is kept once.
+"""
+from typing import Any, Optional
+
+from config.settings import settings
+from tools.cache import SharedCache
+
+REF_PREFIX = "blob:"
+
+
+class BlobStore:
+    """Content-addressed JSON blobs on the shared SQLite cache"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self._cache = SharedCache("blobs", ttl=ttl or settings.BLOB_TTL)
+
+    def put(self, value: Any) -> str:
+        """Store a JSON-serializable value and return its reference id"""
+        ref = REF_PREFIX + self._cache.make_key(value)
+        self._cache.set(ref, value)
+        return ref
+
+    def get(self, ref: Optional[str]) -> Optional[Any]:
+        """Load a value by reference, or None if unknown or expired"""
+        if not ref:
+            return None
+        return self._cache.get(ref)
+
+
+blob_store = BlobStore()
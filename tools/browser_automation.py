@@ -11,13 +11,18 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import TimeoutException
 from typing import Dict, Optional
+from tools.text_length import weighted_length
+from tools.lean_browser import COMPOSE_URLS, apply_lean_options, block_resources, lean_enabled, record_session
 
 class BrowserPoster:
     """Automate posting using browser automation (100% FREE)"""
     
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, lean: Optional[bool] = None):
         self.headless = headless
+        self.lean = lean_enabled(lean)
+        self.last_session = {}  # platform -> time-to-interactive and memory
         self.driver = None
         
     def setup_driver(self):
@@ -29,6 +34,8 @@ class BrowserPoster:
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
+        if self.lean:
+            apply_lean_options(chrome_options)
         
         # Add user data directory to maintain login sessions
         user_data_dir = os.path.expanduser("~/chrome_profile_social")
@@ -36,6 +43,8 @@ class BrowserPoster:
         
         try:
             self.driver = webdriver.Chrome(options=chrome_options)
+            if self.lean:
+                block_resources(self.driver)
             return True
         except Exception as e:
             print(f"❌ Chrome driver setup failed: {str(e)}")
@@ -49,9 +58,13 @@ class BrowserPoster:
                 return False
         
         try:
-            # Go to Twitter
-            self.driver.get("https://twitter.com")
-            time.sleep(3)
+            # Go to Twitter (straight to the composer in lean mode)
+            navigated_at = time.monotonic()
+            if self.lean:
+                self.driver.get(COMPOSE_URLS["twitter"])
+            else:
+                self.driver.get("https://twitter.com")
+                time.sleep(3)
             
             if login_required:
                 print("🔐 Please log in to Twitter in the browser window that opened")
@@ -79,6 +92,8 @@ class BrowserPoster:
                         continue
                 
                 if tweet_box:
+                    self.last_session["twitter"] = record_session("twitter", self.driver, navigated_at)
+                    
                     # Clear and type content
                     tweet_box.clear()
                     tweet_box.send_keys(content)
@@ -109,9 +124,13 @@ class BrowserPoster:
                 return False
         
         try:
-            # Go to LinkedIn feed
-            self.driver.get("https://www.linkedin.com/feed/")
-            time.sleep(3)
+            # Go to LinkedIn feed (with the share box already open in lean mode)
+            navigated_at = time.monotonic()
+            if self.lean:
+                self.driver.get(COMPOSE_URLS["linkedin"])
+            else:
+                self.driver.get("https://www.linkedin.com/feed/")
+                time.sleep(3)
             
             if login_required:
                 print("🔐 Please log in to LinkedIn in the browser window")
@@ -120,17 +139,28 @@ class BrowserPoster:
             
             # Find the post compose area
             try:
-                # Click "Start a post" button
-                start_post_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, '[data-control-name="share_to_feed"]'))
-                )
-                start_post_button.click()
-                time.sleep(2)
+                text_area = None
+                if self.lean:
+                    try:
+                        text_area = WebDriverWait(self.driver, 5).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, '.ql-editor[data-placeholder]'))
+                        )
+                    except TimeoutException:
+                        pass  # share box didn't open from the URL; click it open below
                 
-                # Find text area in the modal
-                text_area = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, '.ql-editor[data-placeholder]'))
-                )
+                if text_area is None:
+                    # Click "Start a post" button
+                    start_post_button = WebDriverWait(self.driver, 10).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, '[data-control-name="share_to_feed"]'))
+                    )
+                    start_post_button.click()
+                    time.sleep(2)
+                    
+                    # Find text area in the modal
+                    text_area = WebDriverWait(self.driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, '.ql-editor[data-placeholder]'))
+                    )
+                self.last_session["linkedin"] = record_session("linkedin", self.driver, navigated_at)
                 
                 # Clear and type content
                 text_area.clear()
@@ -162,7 +192,7 @@ class BrowserPoster:
             print(f"\n🐦 TWITTER CONTENT:")
             print("-" * 40)
             print(f"{content['twitter']}")
-            print(f"\nCharacter count: {len(content['twitter'])}/280")
+            print(f"\nCharacter count: {weighted_length(content['twitter'])}/280")
             input("\n👆 Copy the content above, go to twitter.com, and paste it. Press Enter when done...")
         
         if content.get('linkedin'):
@@ -0,0 +1,121 @@
+# tools/cache.py
+"""
+Cross-process cache backed by SQLite in WAL mode.
+All server workers open the same database file, so a search or model result
+cached by one worker is reused by the others.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from config.settings import settings
+
+
+def open_shared_db(db_path: str) -> sqlite3.Connection:
+    """Open a SQLite connection configured for concurrent use by several processes"""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SharedCache:
+    """Namespaced key/value cache with per-entry expiry, safe across threads and processes"""
+
+    def __init__(self, namespace: str, ttl: Optional[float] = None, db_path: Optional[str] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.db_path = db_path or settings.CACHE_DB
+        # One connection per thread and process (connections must not cross a fork)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = open_shared_db(self.db_path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable hash key from arbitrary JSON-serializable parts"""
+        raw = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if not row:
+            return None
+        if row[1] is not None and row[1] < time.time():
+            self.delete(key)
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value"""
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.time() + ttl if ttl else None
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value, default=str), expires_at)
+        )
+        conn.commit()
+
+    def delete(self, key: str) -> None:
+        """Remove an entry"""
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+        conn.commit()
+
+    def purge_expired(self) -> int:
+        """Drop expired entries in this namespace. Returns the number removed."""
+        conn = self._conn()
+        cursor = conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at < ?",
+            (self.namespace, time.time())
+        )
+        conn.commit()
+        return cursor.rowcount
+
+
+def purge_all_expired(db_path: Optional[str] = None) -> int:
+    """Drop expired entries in every namespace (search, llm, research, blobs...). Returns the number removed."""
+    conn = open_shared_db(db_path or settings.CACHE_DB)
+    try:
+        cursor = conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.OperationalError:
+        # Nothing has been cached yet, so there is no table
+        return 0
+    finally:
+        conn.close()
+
+
+# Shared caches used by the agents
+search_cache = SharedCache("search", ttl=settings.SEARCH_CACHE_TTL)
+llm_cache = SharedCache("llm", ttl=settings.LLM_CACHE_TTL)
+research_cache = SharedCache("research", ttl=settings.RESEARCH_CACHE_TTL)
@@ -0,0 +1,258 @@
+# tools/email_digest.py
+"""
+Email digests of generated content.
+Content is queued per recipient and sent as one email per recipient every
+DIGEST_INTERVAL seconds (or sooner once DIGEST_MAX_ITEMS are waiting), from a
+background thread so generation never waits on SMTP. Connections are pooled
+and reused between digests. Items that fail DIGEST_MAX_ATTEMPTS times are dropped.
+
+Queues live in memory, one per process. With N API server workers each worker
+sends its own digest, so a recipient can get up to N emails per interval (each
+with the content that worker generated). Queued items are lost if a process is
+killed without a clean exit.
+
+To try it locally, run an SMTP stand-in that prints what it receives:
+    python -m aiosmtpd -n -l localhost:1025
+and set SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=false DIGEST_RECIPIENTS=you@example.com
+"""
+import atexit
+import queue
+import smtplib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from tools.metrics import metrics
+
+
+class SMTPPool:
+    """Reusable authenticated SMTP connections"""
+
+    def __init__(self, host: str, port: int, user: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, size: int = 2, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.size = size
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.user:
+            conn.login(self.user, self.password or "")
+        metrics.incr("email.connections_opened")
+        return conn
+
+    def acquire(self) -> smtplib.SMTP:
+        """An open connection: a live idle one if there is one, otherwise a new one"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            try:
+                # Servers drop idle connections; a NOOP finds out before we send
+                if conn.noop()[0] == 250:
+                    return conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(conn)
+
+    def release(self, conn: smtplib.SMTP, broken: bool = False):
+        """Return a connection for reuse (or close it if broken or the pool is full)"""
+        if broken:
+            self._discard(conn)
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn: smtplib.SMTP):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def format_item(item: Dict[str, Any]) -> str:
+    """One content item as a plain-text digest section"""
+    content = item["content"]
+    lines = [f"📝 {item['topic']}  ({item['queued_at']})", ""]
+    if content.get("twitter"):
+        lines += ["🐦 TWITTER:", content["twitter"], ""]
+    if content.get("linkedin"):
+        lines += ["💼 LINKEDIN:", content["linkedin"], ""]
+    if content.get("hashtags"):
+        lines += [f"📊 HASHTAGS: {', '.join(content['hashtags'])}", ""]
+    return "\n".join(lines)
+
+
+def build_digest(recipient: str, items: List[Dict[str, Any]], sender: str) -> EmailMessage:
+    """One email holding every queued item for a recipient"""
+    message = EmailMessage()
+    message["Subject"] = f"📝 {len(items)} new social media post{'s' if len(items) != 1 else ''} ready"
+    message["From"] = sender
+    message["To"] = recipient
+    divider = "\n" + "-" * 40 + "\n\n"
+    body = (
+        f"Your AI Content Engine generated {len(items)} new post{'s' if len(items) != 1 else ''}:\n\n"
+        + divider.join(format_item(item) for item in items)
+        + f"\nSent on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}\n\nHappy posting! 🚀\n"
+    )
+    message.set_content(body)
+    return message
+
+
+class DigestSender:
+    """Batches content per recipient and sends digests in the background"""
+
+    def __init__(self, pool: SMTPPool, sender: str, recipients: List[str],
+                 interval: float, max_items: int, max_attempts: int = 3):
+        self.pool = pool
+        self.sender = sender
+        self.recipients = recipients
+        self.interval = interval
+        self.max_items = max_items
+        self.max_attempts = max_attempts
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="digest-send")
+        self._thread = threading.Thread(target=self._run, name="digest-flusher", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, content: Dict[str, Any], topic: str, recipients: Optional[List[str]] = None) -> bool:
+        """Queue content for the next digest (never blocks on SMTP). False if there is no one to send to."""
+        recipients = recipients or self.recipients
+        if not recipients:
+            return False
+        queued_at = datetime.now().strftime("%H:%M")
+        full = False
+        with self._lock:
+            for recipient in recipients:
+                items = self._pending.setdefault(recipient, [])
+                items.append({"topic": topic, "content": content, "queued_at": queued_at, "attempts": 0})
+                full = full or len(items) >= self.max_items
+            metrics.set_gauge("email.pending", sum(len(v) for v in self._pending.values()))
+        if full:
+            self._wake.set()
+        return True
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Email digest flush error: {str(e)}")
+
+    def _send(self, recipient: str, items: List[Dict[str, Any]]):
+        message = build_digest(recipient, items, self.sender)
+        conn = self.pool.acquire()
+        try:
+            conn.send_message(message)
+        except BaseException:
+            self.pool.release(conn, broken=True)
+            raise
+        self.pool.release(conn)
+
+    def _submit(self, recipient: str, items: List[Dict[str, Any]]) -> Future:
+        try:
+            return self._executor.submit(self._send, recipient, items)
+        except RuntimeError:
+            # At interpreter exit executors stop taking work; send from this thread instead
+            future: Future = Future()
+            try:
+                future.set_result(self._send(recipient, items))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+    def flush(self) -> int:
+        """Send every pending digest now; returns the number of emails sent"""
+        with self._lock:
+            batches, self._pending = self._pending, {}
+        if not batches:
+            return 0
+
+        futures = {recipient: self._submit(recipient, items) for recipient, items in batches.items()}
+        sent = 0
+        for recipient, future in futures.items():
+            items = batches[recipient]
+            try:
+                future.result()
+                sent += 1
+                metrics.incr("email.digests_sent")
+                metrics.incr("email.items_sent", len(items))
+                print(f"📧 Digest with {len(items)} items sent to {recipient}")
+            except Exception as e:
+                metrics.incr("email.send_failed")
+                for item in items:
+                    item["attempts"] += 1
+                retry = [item for item in items if item["attempts"] < self.max_attempts]
+                dropped = len(items) - len(retry)
+                if dropped:
+                    metrics.incr("email.items_dropped", dropped)
+                print(f"❌ Digest to {recipient} failed ({str(e)}); retrying {len(retry)} items next interval"
+                      + (f", dropped {dropped}" if dropped else ""))
+                with self._lock:
+                    self._pending[recipient] = retry + self._pending.get(recipient, [])
+        with self._lock:
+            metrics.set_gauge("email.pending", sum(len(v) for v in self._pending.values()))
+        return sent
+
+    def close(self):
+        """Send what is still pending and close the connections"""
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._executor.shutdown()
+        self.pool.close()
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_digest_sender() -> Optional[DigestSender]:
+    """Process-wide digest sender, or None if SMTP isn't configured.
+
+    DIGEST_RECIPIENTS are the default recipients; callers may name their own.
+    """
+    global _sender
+    if not settings.SMTP_HOST:
+        return None
+    with _sender_lock:
+        if _sender is None:
+            pool = SMTPPool(
+                settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_USER, settings.SMTP_PASSWORD,
+                starttls=settings.SMTP_STARTTLS, size=settings.SMTP_POOL_SIZE
+            )
+            _sender = DigestSender(
+                pool, settings.SMTP_FROM or settings.SMTP_USER or f"content-engine@{settings.SMTP_HOST}",
+                settings.DIGEST_RECIPIENTS, settings.DIGEST_INTERVAL, settings.DIGEST_MAX_ITEMS,
+                settings.DIGEST_MAX_ATTEMPTS
+            )
+            # Don't lose queued content when the process exits
+            atexit.register(_sender.close)
+        return _sender
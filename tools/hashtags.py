@@ -0,0 +1,134 @@
+# tools/hashtags.py
+"""
+Local hashtag recommendations built from content history.
+Indexes which hashtags were used for which topic words and which hashtags
+appear together, so writers can be seeded with proven tags and fallback
+content gets relevant ones without another model call.
+"""
+import glob
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+HASHTAG_PATTERN = re.compile(r'#\w+')
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+SEED_TAGS = 3  # top topic tags whose co-occurring tags are boosted
+_STOPWORDS = {
+    "the", "and", "for", "with", "about", "your", "from", "that", "this", "into", "how",
+    "what", "why", "are", "write", "positive", "educational", "content", "focus", "helpful",
+    "tips", "insights", "trends", "avoid", "any", "negative", "tragic", "controversial"
+}
+
+
+def topic_terms(topic: str) -> Set[str]:
+    """Significant lowercase words of a topic"""
+    return {w for w in _WORD_PATTERN.findall(topic.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+class HashtagIndex:
+    """In-memory topic-term → hashtag and hashtag co-occurrence counts"""
+
+    def __init__(self, content_dir: str = "generated_content"):
+        self.content_dir = content_dir
+        self._term_tags: Dict[str, Counter] = defaultdict(Counter)
+        self._cooccurrence: Dict[str, Counter] = defaultdict(Counter)
+        self._tag_counts: Counter = Counter()
+        self._display: Dict[str, str] = {}
+        self._indexed_files: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, topic: str, hashtags: Iterable[str]):
+        """Index one piece of content"""
+        tags = []
+        for tag in hashtags:
+            if tag.lower() not in tags:
+                tags.append(tag.lower())
+        if not tags:
+            return
+
+        terms = topic_terms(topic)
+        with self._lock:
+            for tag in hashtags:
+                self._display.setdefault(tag.lower(), tag)
+            self._tag_counts.update(tags)
+            for term in terms:
+                self._term_tags[term].update(tags)
+            for tag in tags:
+                self._cooccurrence[tag].update(t for t in tags if t != tag)
+
+    def mark_indexed(self, path: str):
+        """Record that a content file was already indexed via add()"""
+        self._indexed_files.add(path)
+
+    def refresh(self) -> int:
+        """Index content files saved since the last refresh. Returns the number of new files."""
+        added = 0
+        for path in glob.glob(os.path.join(self.content_dir, "content_*.json")):
+            if path in self._indexed_files:
+                continue
+            self._indexed_files.add(path)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if data.get("index_hashtags") is False:
+                continue  # fallback tags, not chosen for the topic
+            content = data.get("content", {})
+            hashtags = content.get("hashtags") or [
+                tag for text in content.values() if isinstance(text, str)
+                for tag in HASHTAG_PATTERN.findall(text)
+            ]
+            self.add(data.get("topic", ""), hashtags)
+            added += 1
+        return added
+
+    def suggest(self, topic: str, k: int = 5, seed_tags: Optional[Iterable[str]] = None) -> List[str]:
+        """Ranked hashtags for a topic, boosted by co-occurrence with seed tags.
+
+        Without seed tags, the top tags for the topic's words seed the boost, so
+        tags often used alongside them rank up even if no topic word names them.
+        """
+        terms = topic_terms(topic)
+        scores: Counter = Counter()
+        with self._lock:
+            for term in terms:
+                tags = self._term_tags.get(term)
+                if not tags:
+                    continue
+                total = sum(tags.values())
+                for tag, count in tags.items():
+                    scores[tag] += count / total
+            if seed_tags is None:
+                seed_tags = [tag for tag, _ in scores.most_common(SEED_TAGS)]
+            for seed in seed_tags:
+                related = self._cooccurrence.get(seed.lower())
+                if not related:
+                    continue
+                total = sum(related.values())
+                for tag, count in related.items():
+                    scores[tag] += 0.5 * count / total
+            ranked = sorted(scores, key=lambda tag: (-scores[tag], -self._tag_counts[tag]))
+            return [self._display[tag] for tag in ranked[:k]]
+
+
+# Other processes (server workers, bulk runs) save content too; pick it up periodically
+REFRESH_INTERVAL = 60  # seconds
+
+hashtag_index = HashtagIndex()
+_last_refresh = None
+_refresh_lock = threading.Lock()
+
+
+def get_hashtag_index() -> HashtagIndex:
+    """Shared index, loaded from saved content on first use and refreshed incrementally"""
+    global _last_refresh
+    with _refresh_lock:
+        if _last_refresh is None or time.monotonic() - _last_refresh > REFRESH_INTERVAL:
+            hashtag_index.refresh()
+            _last_refresh = time.monotonic()
+    return hashtag_index
@@ -0,0 +1,153 @@
+# tools/idempotency.py
+"""
+Idempotency keys for content creation requests.
+The first request with a key runs and its response is stored; retries with
+the same key get that response back, or wait for the run still in progress
+(in this worker or another one) instead of generating the content again.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config.settings import settings
+from tools.cache import open_shared_db
+from tools.metrics import metrics
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request body"""
+
+
+def request_fingerprint(body: Dict[str, Any]) -> str:
+    """Hash of a request body, to detect keys reused for different requests"""
+    raw = json.dumps(body, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """SQLite store of key → in-flight marker or finished response, shared by all workers"""
+
+    def __init__(self, db_path: Optional[str] = None, ttl: Optional[float] = None):
+        self.ttl = ttl or settings.IDEMPOTENCY_TTL
+        self._lock = threading.Lock()
+        self._conn = open_shared_db(db_path or settings.IDEMPOTENCY_DB)
+        self._conn.isolation_level = None
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                response TEXT,
+                started_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        # Runs started by this worker, so retries here attach without polling
+        self._local: Dict[str, asyncio.Future] = {}
+
+    def _begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Claim a key. Returns ("new" | "done" | "in_flight", stored response)."""
+        now = time.time()
+        # A marker older than the worker timeout belongs to a worker that died mid-run
+        stale_before = now - settings.SERVER_WORKER_TIMEOUT
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM idempotency WHERE expires_at < ?", (now,))
+                row = self._conn.execute(
+                    "SELECT fingerprint, response, started_at FROM idempotency WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[0] != fingerprint:
+                    raise IdempotencyConflict(f"Idempotency-Key {key} was used for a different request")
+                if row and row[1] is not None:
+                    return "done", json.loads(row[1])
+                if row and row[2] > stale_before:
+                    return "in_flight", None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (key, fingerprint, response, started_at, expires_at) "
+                    "VALUES (?, ?, NULL, ?, ?)",
+                    (key, fingerprint, now, now + self.ttl)
+                )
+                return "new", None
+            finally:
+                self._conn.execute("COMMIT")
+
+    def _complete(self, key: str, response: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET response = ?, expires_at = ? WHERE key = ?",
+                (json.dumps(response, default=str), time.time() + self.ttl, key)
+            )
+
+    def _release(self, key: str):
+        # Failed runs are not stored, so a retry with the same key runs again
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency WHERE key = ? AND response IS NULL", (key,))
+
+    async def execute(self, key: str, fingerprint: str,
+                      fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """Run fn once per key. Returns (response, replayed).
+
+        Store reads and writes block on SQLite locks, so they run in a thread
+        rather than on the event loop.
+        """
+        attached = False
+        while True:
+            status, response = await asyncio.to_thread(self._begin, key, fingerprint)
+            if status == "done":
+                metrics.incr("idempotency.replayed")
+                return response, True
+
+            if status == "new":
+                future = asyncio.get_running_loop().create_future()
+                self._local[key] = future
+                try:
+                    response = await fn()
+                except BaseException as e:
+                    try:
+                        await asyncio.to_thread(self._release, key)
+                    finally:
+                        # Waiters are told even if this request is cancelled while releasing
+                        if isinstance(e, asyncio.CancelledError):
+                            future.cancel()
+                        else:
+                            future.set_exception(e)
+                            future.exception()  # retrieved here so unattached failures aren't logged
+                    raise
+                else:
+                    try:
+                        await asyncio.to_thread(self._complete, key, response)
+                    finally:
+                        future.set_result(response)
+                    return response, False
+                finally:
+                    self._local.pop(key, None)
+
+            if not attached:
+                metrics.incr("idempotency.attached")
+                attached = True
+            local = self._local.get(key)
+            if local is not None:
+                try:
+                    return await asyncio.shield(local), True
+                except BaseException:
+                    if not local.done():
+                        raise  # this request itself was cancelled
+                    continue  # the original failed and released the key; run it ourselves
+            # Owned by another worker: wait for its result or for the key to be released
+            await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Process-wide store (opened lazily so each pre-forked worker has its own connection)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IdempotencyStore()
+        return _store
@@ -0,0 +1,183 @@
+# tools/inventory.py
+"""
+Pre-generated content inventory.
+Keeps a stock of validated, de-duplicated posts per safe topic so posting
+can take a ready item instantly instead of waiting for a full pipeline run.
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.settings import settings
+from tools.cache import open_shared_db
+
+
+def content_fingerprint(content: str) -> str:
+    """Hash of the normalized post text, used for de-duplication"""
+    normalized = re.sub(r'\s+', ' ', content.lower()).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ContentInventory:
+    """SQLite-backed store of ready-to-post content, keyed by topic"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.INVENTORY_DB
+        self._lock = threading.Lock()
+        self._conn = open_shared_db(self.db_path)
+        self._conn.isolation_level = None
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS inventory (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                content TEXT NOT NULL,
+                hashtags TEXT NOT NULL,
+                content_hash TEXT NOT NULL UNIQUE,
+                created_at TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_topic ON inventory (topic, id)")
+        # Everything ever taken for posting, so it is never stocked again
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS taken (
+                content_hash TEXT PRIMARY KEY,
+                taken_at TEXT NOT NULL
+            )
+        """)
+
+    def add(self, topic: str, content: str, hashtags: Optional[List[str]] = None) -> bool:
+        """Stock a validated post. Returns False if it duplicates a stocked or already taken post."""
+        content_hash = content_fingerprint(content)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM taken WHERE content_hash = ?", (content_hash,)).fetchone():
+                return False
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO inventory (topic, content, hashtags, content_hash, created_at) VALUES (?, ?, ?, ?, ?)",
+                (topic, content, json.dumps(hashtags or []), content_hash, datetime.now().isoformat())
+            )
+            return cursor.rowcount == 1
+
+    def take(self, topic: Optional[str] = None) -> Optional[Dict]:
+        """Remove and return the oldest ready post for a topic (or any topic)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if topic:
+                    row = self._conn.execute(
+                        "SELECT id, topic, content, hashtags, content_hash, created_at FROM inventory WHERE topic = ? ORDER BY id LIMIT 1",
+                        (topic,)
+                    ).fetchone()
+                else:
+                    row = self._conn.execute(
+                        "SELECT id, topic, content, hashtags, content_hash, created_at FROM inventory ORDER BY id LIMIT 1"
+                    ).fetchone()
+                if not row:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute("DELETE FROM inventory WHERE id = ?", (row[0],))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO taken (content_hash, taken_at) VALUES (?, ?)",
+                    (row[4], datetime.now().isoformat())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return {
+            "topic": row[1],
+            "content": row[2],
+            "hashtags": json.loads(row[3]),
+            "created_at": row[5]
+        }
+
+    def count(self, topic: str) -> int:
+        """Number of ready posts for a topic"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM inventory WHERE topic = ?", (topic,)).fetchone()[0]
+
+    def levels(self) -> Dict[str, int]:
+        """Ready post count per topic"""
+        with self._lock:
+            rows = self._conn.execute("SELECT topic, COUNT(*) FROM inventory GROUP BY topic").fetchall()
+        return {topic: count for topic, count in rows}
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class InventoryBuilder:
+    """Background refiller that keeps every safe topic stocked up to a target level"""
+
+    def __init__(self, automation, inventory: ContentInventory,
+                 target_per_topic: Optional[int] = None, refill_interval: Optional[float] = None):
+        self.automation = automation
+        self.inventory = inventory
+        self.target_per_topic = target_per_topic or settings.INVENTORY_TARGET_PER_TOPIC
+        self.refill_interval = refill_interval or settings.INVENTORY_REFILL_INTERVAL
+        # Cleared while interactive work is running so refills only use idle time
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self._interactive = 0
+        self._task = None
+        # Interactive work on this automation pauses the refiller
+        automation.refiller = self
+
+    @contextlib.asynccontextmanager
+    async def interactive(self):
+        """Pause refills while a user is waiting on generation or posting"""
+        self._interactive += 1
+        self.idle.clear()
+        try:
+            yield
+        finally:
+            self._interactive -= 1
+            if not self._interactive:
+                self.idle.set()
+
+    async def refill_once(self) -> int:
+        """Top up every safe topic that is below target. Returns the number of posts stocked."""
+        stocked = 0
+        for topic in self.automation.safe_topics:
+            while self.inventory.count(topic) < self.target_per_topic:
+                await self.idle.wait()
+
+                result = await self.automation.generate_safe_content(topic)
+                if not result or not result.get("final_twitter"):
+                    print(f"⚠️ Inventory: could not stock '{topic}', will retry next cycle")
+                    break
+
+                if self.inventory.add(topic, result["final_twitter"], result.get("hashtags", [])):
+                    stocked += 1
+                    print(f"📦 Inventory: stocked '{topic}' ({self.inventory.count(topic)}/{self.target_per_topic})")
+                else:
+                    print(f"♻️ Inventory: duplicate content for '{topic}' skipped")
+                    break
+        return stocked
+
+    async def run_forever(self):
+        """Refill loop, sleeping between cycles"""
+        while True:
+            try:
+                await self.refill_once()
+            except Exception as e:
+                print(f"❌ Inventory refill error: {str(e)}")
+            await asyncio.sleep(self.refill_interval)
+
+    def start(self) -> asyncio.Task:
+        """Start the refill loop as a background task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+        return self._task
+
+    def stop(self):
+        """Cancel the background refill loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
@@ -0,0 +1,127 @@
+# tools/lean_browser.py
+"""
+Lean browser mode for posting automation.
+Posting only needs the compose box, so lean sessions skip everything else:
+the page-load strategy is "eager" (don't wait for images and iframes), images,
+video, fonts and tracking scripts are blocked, and navigation goes straight
+to the compose URL instead of the full home feed. Each session reports its
+memory use (needs psutil) and time-to-interactive so hosts can be sized for
+more sessions.
+"""
+import time
+from typing import Dict, List, Optional
+
+from selenium.webdriver.chrome.options import Options
+
+from config.settings import settings
+from tools.metrics import metrics
+
+COMPOSE_URLS = {
+    "twitter": "https://x.com/compose/post",
+    "linkedin": "https://www.linkedin.com/feed/?shareActive=true"
+}
+
+# Chrome content settings: 2 = block
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+    "profile.managed_default_content_settings.geolocation": 2,
+    "profile.managed_default_content_settings.plugins": 2
+}
+
+LEAN_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--autoplay-policy=user-gesture-required",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--renderer-process-limit=2"
+]
+
+# Blocked through DevTools, which also covers requests the prefs above miss
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.m3u8", "*.m4s", "*.webm",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*pbs.twimg.com/media*", "*video.twimg.com*", "*abs.twimg.com/responsive-web/client-web/emoji*",
+    "*media.licdn.com*", "*static.licdn.com/aero-v1/sc/h/*.woff*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*ads-twitter.com*", "*analytics.twitter.com*", "*px.ads.linkedin.com*"
+]
+
+
+def apply_lean_options(chrome_options: Options):
+    """Configure Chrome options for a lean posting session"""
+    chrome_options.page_load_strategy = "eager"
+    chrome_options.add_experimental_option("prefs", LEAN_PREFS)
+    for arg in LEAN_ARGS:
+        chrome_options.add_argument(arg)
+
+
+def block_resources(driver, patterns: Optional[List[str]] = None) -> bool:
+    """Block non-essential requests via DevTools (Chromium only)"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns or BLOCKED_URL_PATTERNS})
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not block resources via DevTools: {str(e)}")
+        return False
+
+
+def session_memory_mb(driver) -> Optional[float]:
+    """Resident memory of the browser session (all Chrome processes), in MB.
+
+    Needs psutil; None without it.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        # chromedriver → chrome → renderer/GPU/utility processes
+        root = psutil.Process(driver.service.process.pid)
+        processes = root.children(recursive=True)
+        return round(sum(p.memory_info().rss for p in processes) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def page_js_heap_mb(driver) -> Optional[float]:
+    """JS heap of the current page, in MB (one page only, not the whole session)"""
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        result = driver.execute_cdp_cmd("Performance.getMetrics", {})
+        values = {m["name"]: m["value"] for m in result.get("metrics", [])}
+        heap = values.get("JSHeapUsedSize")
+        return round(heap / (1024 * 1024), 1) if heap else None
+    except Exception:
+        return None
+
+
+def record_session(platform: str, driver, navigated_at: float) -> Dict[str, Optional[float]]:
+    """Report time-to-interactive (navigation → compose box ready), session memory and page JS heap"""
+    tti_ms = round((time.monotonic() - navigated_at) * 1000, 1)
+    memory_mb = session_memory_mb(driver)
+    js_heap_mb = page_js_heap_mb(driver)
+    metrics.set_gauge(f"browser.{platform}.tti_ms", tti_ms)
+    summary = f"⏱️ {platform.title()} interactive in {tti_ms:.0f} ms"
+    if memory_mb is not None:
+        metrics.set_gauge(f"browser.{platform}.memory_mb", memory_mb)
+        summary += f", session {memory_mb} MB"
+    if js_heap_mb is not None:
+        metrics.set_gauge(f"browser.{platform}.js_heap_mb", js_heap_mb)
+        summary += f", page JS heap {js_heap_mb} MB"
+    print(summary)
+    return {"tti_ms": tti_ms, "memory_mb": memory_mb, "js_heap_mb": js_heap_mb}
+
+
+def lean_enabled(lean: Optional[bool]) -> bool:
+    """Explicit choice, or BROWSER_LEAN_MODE"""
+    return settings.BROWSER_LEAN_MODE if lean is None else lean
@@ -0,0 +1,42 @@
+# tools/metrics.py
+"""
+Lightweight in-process metrics registry.
+Counters and gauges are updated by agents and tools and exposed by the API's /metrics endpoint.
+"""
+import threading
+from typing import Dict
+
+
+class MetricsRegistry:
+    """Thread-safe counters and gauges"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increase a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str, default: float = 0) -> float:
+        """Read a counter or gauge"""
+        with self._lock:
+            return self._counters.get(name, self._gauges.get(name, default))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of all current values"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges)
+            }
+
+
+metrics = MetricsRegistry()
@@ -1,11 +1,13 @@
 # tools/alternative_posting.py
 import json
 import os
+import uuid
 from datetime import datetime
 from typing import Dict, List, Optional
 import qrcode
 from io import BytesIO
 import base64
+from tools.text_length import weighted_length
 
 class AlternativePostingManager:
     """Free alternatives for social media posting"""
@@ -14,10 +16,15 @@ class AlternativePostingManager:
         self.output_dir = "generated_content"
         os.makedirs(self.output_dir, exist_ok=True)
     
-    def save_content_to_file(self, content: Dict, topic: str) -> str:
-        """Save generated content to structured files"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.output_dir}/content_{timestamp}_{topic.replace(' ', '_')[:20]}.json"
+    @staticmethod
+    def _file_id(run_id: Optional[str]) -> str:
+        """Timestamp plus run id (or a random one) so concurrent runs never share a file"""
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{(run_id or uuid.uuid4().hex)[:12]}"
+    
+    def save_content_to_file(self, content: Dict, topic: str, run_id: Optional[str] = None,
+                             research: Optional[Dict] = None, index_hashtags: bool = True) -> str:
+        """Save generated content (and the research it was written from) to structured files"""
+        filename = f"{self.output_dir}/content_{self._file_id(run_id)}_{topic.replace(' ', '_')[:20]}.json"
         
         content_data = {
             "topic": topic,
@@ -29,16 +36,20 @@ class AlternativePostingManager:
                 "optimal_times": "Best posting times: 9AM, 1PM, 5PM in your timezone"
             }
         }
+        if research:
+            content_data["research"] = research
+        if not index_hashtags:
+            # Stock fallback tags; the hashtag index skips this file
+            content_data["index_hashtags"] = False
         
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(content_data, f, indent=2, ensure_ascii=False)
         
         return filename
     
-    def create_content_card(self, content: Dict, topic: str) -> str:
+    def create_content_card(self, content: Dict, topic: str, run_id: Optional[str] = None) -> str:
         """Create a visual content card as HTML for easy sharing"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.output_dir}/content_card_{timestamp}.html"
+        filename = f"{self.output_dir}/content_card_{self._file_id(run_id)}.html"
         
         twitter_content = content.get('twitter', 'Not generated')
         linkedin_content = content.get('linkedin', 'Not generated')
@@ -69,7 +80,7 @@ class AlternativePostingManager:
                 <div id="twitter-content">{twitter_content}</div>
                 <br>
                 <button class="copy-btn" onclick="copyToClipboard('twitter-content')">Copy Twitter Content</button>
-                <p><small>Character count: {len(twitter_content)}/280</small></p>
+                <p><small>Character count: {weighted_length(twitter_content)}/280</small></p>
             </div>
             
             <div class="card linkedin">
@@ -110,8 +121,7 @@ class AlternativePostingManager:
     
     def schedule_content(self, content: Dict, topic: str, schedule_times: List[str]) -> str:
         """Create a content schedule file"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.output_dir}/schedule_{timestamp}.json"
+        filename = f"{self.output_dir}/schedule_{self._file_id(None)}.json"
         
         schedule_data = {
             "topic": topic,
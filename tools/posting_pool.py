@@ -0,0 +1,150 @@
+# tools/posting_pool.py
+"""
+Concurrent posting for several accounts.
+Each account has a worker thread that owns its own browser (and Chrome
+profile, so logins stay separate). The dispatcher routes each queued post to
+its account's worker; accounts post in parallel, posts for one account stay
+in order.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from config.settings import settings
+from tools.metrics import metrics
+
+
+class PostJob:
+    """One queued post for an account"""
+
+    def __init__(self, account: str, content: str):
+        self.account = account
+        self.content = content
+        self.future: Future = Future()
+        self.queued_at = time.monotonic()
+
+
+class AccountWorker:
+    """Posts one account's queue in order using that account's browser profile"""
+
+    def __init__(self, account: str, poster_factory: Callable[[str], object]):
+        self.account = account
+        self.profile_dir = os.path.join(os.path.expanduser(settings.POSTING_PROFILES_DIR), account)
+        self._poster_factory = poster_factory
+        self._queue: "queue.Queue[Optional[PostJob]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.posted = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"poster-{account}", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, job: PostJob):
+        self._queue.put(job)
+        metrics.set_gauge(f"posting.{self.account}.queue_depth", self.queue_depth)
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        # The browser is created and used only on this thread
+        try:
+            poster = self._poster_factory(self.profile_dir)
+        except Exception as e:
+            print(f"❌ [{self.account}] could not start browser: {str(e)}")
+            self._fail_all(e)
+            return
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                metrics.set_gauge(f"posting.{self.account}.queue_depth", self.queue_depth)
+                started = time.monotonic()
+                try:
+                    ok = bool(poster.post_to_twitter(job.content))
+                except Exception as e:
+                    print(f"❌ [{self.account}] posting error: {str(e)}")
+                    ok = False
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self.busy_seconds += elapsed
+                    if ok:
+                        self.posted += 1
+                    else:
+                        self.failed += 1
+                metrics.incr(f"posting.{self.account}.{'posted' if ok else 'failed'}")
+                print(f"{'✅' if ok else '❌'} [{self.account}] post finished in {elapsed:.1f}s")
+                job.future.set_result(ok)
+        finally:
+            poster.close()
+
+    def _fail_all(self, error: Exception):
+        # Without a browser every queued (and future) post for this account fails
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self.failed += 1
+            metrics.incr(f"posting.{self.account}.failed")
+            job.future.set_exception(error)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            done = self.posted + self.failed
+            hours = max(time.monotonic() - self.started_at, 1e-9) / 3600
+            return {
+                "queue_depth": self.queue_depth,
+                "posted": self.posted,
+                "failed": self.failed,
+                "avg_post_seconds": round(self.busy_seconds / done, 2) if done else 0.0,
+                "posts_per_hour": round(self.posted / hours, 2)
+            }
+
+
+def _default_poster(profile_dir: str):
+    """A poster with its browser already running, so a broken setup fails the account once, not every post"""
+    from Twitter_main import RobustTwitterPoster
+    poster = RobustTwitterPoster(headless=False, profile_dir=profile_dir)
+    if not poster.setup_driver():
+        raise RuntimeError(f"Chrome could not start with profile {profile_dir}")
+    return poster
+
+
+class PostingDispatcher:
+    """Routes posts to per-account workers that run in parallel"""
+
+    def __init__(self, accounts: Optional[List[str]] = None,
+                 poster_factory: Callable[[str], object] = _default_poster):
+        accounts = accounts or settings.POSTING_ACCOUNTS
+        if not accounts:
+            raise ValueError("No posting accounts configured (set POSTING_ACCOUNTS)")
+        self.workers = {account: AccountWorker(account, poster_factory) for account in accounts}
+
+    def submit(self, account: str, content: str) -> Future:
+        """Queue a post for an account. The future resolves to True once posted."""
+        worker = self.workers.get(account)
+        if worker is None:
+            raise ValueError(f"Unknown posting account: {account}")
+        job = PostJob(account, content)
+        worker.submit(job)
+        return job.future
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-account queue depth and throughput"""
+        return {account: worker.stats() for account, worker in self.workers.items()}
+
+    def close(self):
+        """Finish queued posts, then close every browser"""
+        for worker in self.workers.values():
+            worker.stop()
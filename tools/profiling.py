@@ -0,0 +1,78 @@
+# tools/profiling.py
+"""
+On-demand sampling profiles of pipeline runs.
+A profiled run is recorded with pyinstrument and saved as a speedscope JSON
+(open at https://www.speedscope.app) and an HTML flame view, named by run id.
+Unprofiled runs only pay for one boolean check.
+"""
+import os
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from config.settings import settings
+from tools.metrics import metrics
+
+PROFILE_FORMATS = {"speedscope": "speedscope.json", "html": "html"}
+
+
+def _safe_name(run_id: str) -> str:
+    # Run ids may come from API clients; never let them escape the profile directory
+    return re.sub(r'[^A-Za-z0-9_-]', "_", run_id)[:128]
+
+
+def profile_path(run_id: str, fmt: str = "speedscope") -> str:
+    """Where a run's profile is (or would be) saved"""
+    return os.path.join(settings.PROFILE_DIR, f"{_safe_name(run_id)}.{PROFILE_FORMATS[fmt]}")
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Profile this run if the request asked for it or PROFILE_PIPELINE is set"""
+    return requested or settings.PROFILE_ALL_RUNS
+
+
+@contextmanager
+def profile_run(run_id: str, enabled: bool) -> Iterator[Dict[str, str]]:
+    """Profile the enclosed block on the current thread.
+
+    Yields a dict that is filled with the saved file paths on exit.
+    """
+    files: Dict[str, str] = {}
+    if not enabled:
+        yield files
+        return
+
+    try:
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+    except ImportError:
+        print("💡 Install pyinstrument to profile pipeline runs")
+        yield files
+        return
+
+    profiler = Profiler(interval=settings.PROFILE_INTERVAL, async_mode="disabled")
+    profiler.start()
+    try:
+        yield files
+    finally:
+        profiler.stop()
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        outputs = {
+            "speedscope": profiler.output(renderer=SpeedscopeRenderer()),
+            "html": profiler.output_html()
+        }
+        for fmt, output in outputs.items():
+            path = profile_path(run_id, fmt)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(output)
+            files[fmt] = path
+        metrics.incr("profiling.runs")
+        print(f"🔬 Profile saved: {files['speedscope']}")
+
+
+def find_profile(run_id: str, fmt: str = "speedscope") -> Optional[str]:
+    """Path of a saved profile, or None"""
+    if fmt not in PROFILE_FORMATS:
+        return None
+    path = profile_path(run_id, fmt)
+    return path if os.path.exists(path) else None
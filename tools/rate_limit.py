@@ -0,0 +1,176 @@
+# tools/rate_limit.py
+"""
+Shared adaptive rate limiting for external providers (Gemini, DuckDuckGo).
+Each (provider, model) pair gets a token bucket for request rate plus AIMD
+concurrency control: limits back off multiplicatively when the provider
+throttles us and ramp up additively while calls succeed.
+Limits are per process: with N server workers the provider sees up to N times
+the configured RPM, so set the *_RPM settings to the provider quota divided by N.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.settings import settings
+from tools.metrics import metrics
+
+
+def is_throttle_error(error: Exception) -> bool:
+    """True if an exception means the provider is rate limiting us (HTTP 429 / quota exhausted)"""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    name = type(error).__name__.lower()
+    if "resourceexhausted" in name or "ratelimit" in name:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "quota" in message
+
+
+# Call outcomes reported to ProviderLimiter.release
+SUCCESS = "success"
+THROTTLED = "throttled"
+FAILED = "failed"
+
+
+def call_outcome(error: Exception) -> str:
+    """THROTTLED or FAILED for a call that raised"""
+    return THROTTLED if is_throttle_error(error) else FAILED
+
+
+class TokenBucket:
+    """Token bucket with an adjustable refill rate (tokens per second)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None):
+        """Block until a token is available, then take it (TimeoutError if none before the monotonic deadline)"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise TimeoutError("no rate token before deadline")
+            time.sleep(wait)
+
+
+class ProviderLimiter:
+    """Rate and concurrency limits for one provider/model, adapted with AIMD"""
+
+    def __init__(self, name: str, max_rpm: float, max_concurrency: int):
+        self.name = name
+        self.max_rate = max_rpm / 60.0
+        self.min_rate = self.max_rate / 20
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(self.max_rate, capacity=max(1.0, max_concurrency))
+        self.concurrency_limit = float(max_concurrency)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge(f"ratelimit.{self.name}.rpm", round(self.bucket.rate * 60, 2))
+        metrics.set_gauge(f"ratelimit.{self.name}.concurrency_limit", int(self.concurrency_limit))
+        metrics.set_gauge(f"ratelimit.{self.name}.in_flight", self.in_flight)
+
+    def acquire(self, deadline: Optional[float] = None):
+        """Wait for a concurrency slot and a rate token (TimeoutError past the monotonic deadline)"""
+        with self._cond:
+            while self.in_flight >= int(self.concurrency_limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"{self.name}: no slot before deadline")
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            self._publish()
+        try:
+            self.bucket.acquire(deadline)
+        except TimeoutError:
+            # Give the slot back without adapting: the provider wasn't called
+            with self._cond:
+                self.in_flight -= 1
+                self._publish()
+                self._cond.notify_all()
+            raise
+
+    def release(self, outcome: str = SUCCESS):
+        """Return the slot and adapt limits to the outcome of the call.
+
+        Only SUCCESS ramps up and only THROTTLED backs off; other failures
+        (timeouts, server errors, cancelled streams) leave the limits alone.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == THROTTLED:
+                # Multiplicative decrease
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+                metrics.incr(f"ratelimit.{self.name}.throttled")
+            elif outcome == SUCCESS:
+                # Additive increase: about +1 slot per window of successful calls
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+                self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 20 / max(1.0, self.concurrency_limit))
+            self._publish()
+            self._cond.notify_all()
+
+
+class RateLimiter:
+    """Registry of per-provider/model limiters shared by all agents in the process"""
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, provider: str, model: str = "default") -> ProviderLimiter:
+        """Get or create the limiter for a provider/model pair"""
+        key = (provider, model)
+        with self._lock:
+            if key not in self._limiters:
+                limits = settings.RATE_LIMITS.get(provider, settings.RATE_LIMITS["default"])
+                self._limiters[key] = ProviderLimiter(
+                    f"{provider}.{model}", limits["rpm"], limits["max_concurrency"]
+                )
+            return self._limiters[key]
+
+    def call(self, provider: str, model: str, fn: Callable[..., Any], /, *args,
+             deadline: Optional[float] = None, **kwargs) -> Any:
+        """Run fn under the provider's limits, backing off and retrying when throttled.
+
+        With a monotonic deadline, waiting for a slot, a token or a backoff
+        never runs past it (TimeoutError instead).
+        """
+        limiter = self.limiter(provider, model)
+        retries = settings.RATE_LIMIT_MAX_RETRIES
+
+        for attempt in range(retries + 1):
+            limiter.acquire(deadline)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                outcome = call_outcome(e)
+                limiter.release(outcome)
+                if outcome != THROTTLED or attempt == retries:
+                    raise
+                backoff = min(30.0, 2 ** attempt)
+                if deadline is not None and time.monotonic() + backoff > deadline:
+                    raise
+                print(f"⏳ {provider} throttled, retrying in {backoff:.0f}s ({attempt + 1}/{retries})")
+                time.sleep(backoff)
+                continue
+            limiter.release()
+            return result
+
+
+rate_limiter = RateLimiter()
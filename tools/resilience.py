@@ -0,0 +1,314 @@
+# tools/resilience.py
+"""
+Deadlines, hedged requests and circuit breaking for model calls.
+A call that runs past the observed p95 latency gets one duplicate request and
+the first success wins. When a provider's error rate spikes, the breaker opens
+and callers go straight to their fallback path until it cools down.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from config.settings import settings
+from tools.metrics import metrics
+from tools.rate_limit import rate_limiter, call_outcome, SUCCESS, FAILED
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a guarded call does not finish before its deadline"""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: Optional[int] = None) -> Optional[float]:
+        """Latency at percentile p (0-100), or None without enough samples"""
+        if min_samples is None:
+            min_samples = settings.HEDGE_MIN_SAMPLES
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class CircuitBreaker:
+    """Opens when the error rate over a time window passes a threshold.
+
+    After the cooldown a single probe call is let through: its success closes
+    the breaker, its failure re-opens it. Outcomes of calls that started
+    before the breaker last changed state are ignored.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._outcomes = deque()  # (timestamp, ok)
+        self._opened_at = None
+        self._probe_started = None
+        self._changed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - settings.BREAKER_WINDOW:
+            self._outcomes.popleft()
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at >= settings.BREAKER_COOLDOWN:
+            return "half_open"
+        return "open"
+
+    def _probe_free(self, now: float) -> bool:
+        # A probe that never reported back (e.g. its caller died) is replaced after another cooldown
+        return self._probe_started is None or now - self._probe_started >= settings.BREAKER_COOLDOWN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def error_rate(self) -> float:
+        """Share of failed calls in the current window"""
+        with self._lock:
+            self._trim(time.monotonic())
+            if not self._outcomes:
+                return 0.0
+            return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def available(self) -> bool:
+        """Would allow() let a call through right now (without taking the probe)"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            return state == "closed" or (state == "half_open" and self._probe_free(now))
+
+    def allow(self) -> bool:
+        """False while open. After the cooldown, exactly one caller gets True to probe the provider."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            if state == "closed":
+                return True
+            if state == "half_open" and self._probe_free(now):
+                self._probe_started = now
+                return True
+            return False
+
+    def record(self, ok: bool, started_at: Optional[float] = None):
+        """Report the outcome of a call that started at started_at (monotonic)"""
+        now = time.monotonic()
+        with self._lock:
+            if started_at is not None and started_at < self._changed_at:
+                # Started before the breaker tripped or closed: says nothing about the provider now
+                return
+            if self._opened_at is not None:
+                # Half-open probe: a success closes the breaker, a failure re-opens it
+                if ok:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = now
+                self._probe_started = None
+                self._changed_at = now
+                metrics.set_gauge(f"breaker.{self.name}.open", int(self._opened_at is not None))
+                return
+
+            self._outcomes.append((now, ok))
+            self._trim(now)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if (len(self._outcomes) >= settings.BREAKER_MIN_CALLS
+                    and failures / len(self._outcomes) >= settings.BREAKER_ERROR_RATE):
+                self._opened_at = now
+                self._changed_at = now
+                metrics.incr(f"breaker.{self.name}.trips")
+                print(f"🔌 Circuit breaker opened for {self.name}: {failures}/{len(self._outcomes)} calls failed")
+            metrics.set_gauge(f"breaker.{self.name}.open", int(self._opened_at is not None))
+
+
+class CallGuard:
+    """Applies deadline, hedging and circuit breaking to calls for one provider/model"""
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.name = f"{provider}.{model}"
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(self.name)
+        self._calls = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def _can_hedge(self) -> bool:
+        with self._lock:
+            return self._hedges < max(1, self._calls) * settings.HEDGE_MAX_RATIO
+
+    def call(self, fn: Callable[..., Any], /, *args, timeout: Optional[float] = None,
+             hedge: bool = True, **kwargs) -> Any:
+        if not self.breaker.allow():
+            metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        timeout = timeout or settings.MODEL_CALL_TIMEOUT
+        started = time.monotonic()
+        deadline_at = started + timeout
+        with self._lock:
+            self._calls += 1
+
+        def attempt():
+            attempt_started = time.monotonic()
+            result = rate_limiter.call(self.provider, self.model, fn, *args, **kwargs)
+            self.latency.record(time.monotonic() - attempt_started)
+            return result
+
+        p95 = self.latency.percentile(95) if hedge else None
+        hedge_at = started + p95 if p95 is not None and p95 < timeout else None
+
+        pending = {_executor.submit(attempt)}
+        error = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            wait_until = deadline_at if hedge_at is None else min(deadline_at, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, wait_until - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for other in pending:
+                    other.cancel()
+                self.breaker.record(True, started)
+                metrics.set_gauge(f"latency.{self.name}.p95", round(self.latency.percentile(95) or 0, 3))
+                return result
+
+            if hedge_at is not None and time.monotonic() >= hedge_at and pending:
+                hedge_at = None
+                if self._can_hedge():
+                    # Slow call: send one duplicate, first success wins
+                    with self._lock:
+                        self._hedges += 1
+                    metrics.incr(f"hedge.{self.name}.sent")
+                    pending.add(_executor.submit(attempt))
+
+        self.breaker.record(False, started)
+        if pending:
+            for future in pending:
+                future.cancel()
+            metrics.incr(f"deadline.{self.name}.exceeded")
+            raise DeadlineExceeded(f"{self.name} call exceeded {timeout:.1f}s deadline")
+        raise error
+
+    def stream(self, fn: Callable[..., Iterator[Any]], /, *args, timeout: Optional[float] = None,
+               **kwargs) -> Iterator[Any]:
+        """Iterate fn's chunks under the rate limit, circuit breaker and a deadline.
+
+        The deadline covers both the wait for the first chunk and the whole
+        stream. Closing the iterator early stops the provider stream; that is
+        not counted as a failure.
+        """
+        if not self.breaker.allow():
+            metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        timeout = timeout or settings.MODEL_CALL_TIMEOUT
+        started = time.monotonic()
+        deadline_at = started + timeout
+        limiter = rate_limiter.limiter(self.provider, self.model)
+        try:
+            limiter.acquire(deadline_at)
+        except TimeoutError:
+            metrics.incr(f"deadline.{self.name}.exceeded")
+            raise DeadlineExceeded(f"{self.name} stream got no rate limit slot within {timeout:.1f}s")
+
+        # The provider stream blocks, so it is read on a pool thread and handed over
+        # through a queue that the caller can wait on with a deadline
+        chunks: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+
+        def produce():
+            # A stream the caller stopped early neither ramps the limits up nor backs them off
+            outcome = FAILED
+            source = None
+            try:
+                source = fn(*args, **kwargs)
+                for chunk in source:
+                    if stop.is_set():
+                        break
+                    chunks.put(("chunk", chunk))
+                else:
+                    outcome = SUCCESS
+                chunks.put(("end", None))
+            except Exception as e:
+                outcome = call_outcome(e)
+                chunks.put(("error", e))
+            finally:
+                if source is not None and hasattr(source, "close"):
+                    source.close()
+                limiter.release(outcome)
+
+        _executor.submit(produce)
+        try:
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=max(0.0, deadline_at - time.monotonic()))
+                except queue.Empty:
+                    self.breaker.record(False, started)
+                    metrics.incr(f"deadline.{self.name}.exceeded")
+                    raise DeadlineExceeded(f"{self.name} stream exceeded {timeout:.1f}s deadline")
+                if kind == "error":
+                    self.breaker.record(False, started)
+                    raise value
+                if kind == "end":
+                    self.latency.record(time.monotonic() - started)
+                    self.breaker.record(True, started)
+                    metrics.set_gauge(f"latency.{self.name}.p95", round(self.latency.percentile(95) or 0, 3))
+                    return
+                yield value
+        except GeneratorExit:
+            # The caller stopped reading (e.g. a safety abort); the provider was fine
+            self.breaker.record(True, started)
+            raise
+        finally:
+            stop.set()
+
+
+_executor = ThreadPoolExecutor(max_workers=settings.MODEL_CALL_POOL_SIZE, thread_name_prefix="model-call")
+_guards: Dict[str, CallGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(provider: str, model: str) -> CallGuard:
+    """Shared guard for a provider/model pair"""
+    key = f"{provider}.{model}"
+    with _guards_lock:
+        if key not in _guards:
+            _guards[key] = CallGuard(provider, model)
+        return _guards[key]
+
+
+def guarded_call(provider: str, model: str, fn: Callable[..., Any], /, *args,
+                 timeout: Optional[float] = None, hedge: bool = True, **kwargs) -> Any:
+    """Call fn with a deadline, a hedged duplicate past p95 and circuit breaking.
+
+    Raises CircuitOpenError or DeadlineExceeded so callers can take their fallback path.
+    """
+    return get_guard(provider, model).call(fn, *args, timeout=timeout, hedge=hedge, **kwargs)
@@ -0,0 +1,82 @@
+# tools/safety.py
+"""
+Content safety rules shared by validation and streaming generation.
+validate-style checks run on finished text; StreamingSafetyGuard applies the
+same rules to a stream chunk by chunk so an unsafe completion can be
+cancelled as soon as it goes wrong.
+"""
+import re
+from typing import List, Optional
+
+BANNED_KEYWORDS = [
+    "crash", "died", "dead", "kill", "tragedy", "tragedies", "tragic", "disaster",
+    "accident", "explosion", "terrorist", "attack", "bomb",
+    "murder", "suicide", "death", "funeral", "shooting"
+]
+
+FAKE_NEWS_PATTERNS = [
+    r'\d+\s+(dead|died|killed)',  # "279 dead"
+    r'(breaking|urgent).*crash',
+    r'astrologer.*predict',
+    r'investigation.*death'
+]
+
+# Banned words match anywhere, inflections and compounds included ("deadly",
+# "attackers", "murderer"). Only these known-harmless words and phrases are exempt.
+ALLOWED_PHRASES = ["deadline", "deadlift", "crash course", "bombastic", "skill"]
+
+_KEYWORD_RE = re.compile("|".join(map(re.escape, BANNED_KEYWORDS)))
+_ALLOWED_RE = re.compile("|".join(map(re.escape, ALLOWED_PHRASES)))
+_COMPILED_PATTERNS = [(pattern, re.compile(pattern)) for pattern in FAKE_NEWS_PATTERNS]
+# The last words of a stream may still grow into an allowed one ("dead" → "deadline", "crash" → "crash course")
+_HOLD_BACK = re.compile(r'(?:\S+\s*){0,2}$')
+
+
+class UnsafeContentError(ValueError):
+    """No generated draft passed the safety rules"""
+
+
+def _scan(text_lower: str, limit: int) -> Optional[str]:
+    """First violation that ends within text_lower[:limit]"""
+    # Blank out allowed phrases, keeping offsets
+    text_lower = _ALLOWED_RE.sub(lambda m: " " * len(m.group()), text_lower)
+    match = _KEYWORD_RE.search(text_lower)
+    if match and match.end() <= limit:
+        return f"Contains sensitive keyword: {match.group()}"
+    for pattern, compiled in _COMPILED_PATTERNS:
+        match = compiled.search(text_lower)
+        if match and match.end() <= limit:
+            return f"Matches fake news pattern: {pattern}"
+    return None
+
+
+def find_violation(text: str) -> Optional[str]:
+    """Reason the text breaks a safety rule, or None if it is safe"""
+    return _scan(text.lower(), len(text))
+
+
+class StreamingSafetyGuard:
+    """Applies the safety rules incrementally to streamed text"""
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._lower = ""
+        self.violation: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a chunk; returns the violation as soon as one appears"""
+        self._chunks.append(chunk)
+        self._lower += chunk.lower()
+        # Posts are short, so the whole text is rescanned; only matches ending
+        # before the last (possibly incomplete) words count yet
+        self.violation = _scan(self._lower, _HOLD_BACK.search(self._lower).start())
+        return self.violation
+
+    def finish(self) -> Optional[str]:
+        """Check the complete text once the stream has ended"""
+        self.violation = _scan(self._lower, len(self._lower))
+        return self.violation
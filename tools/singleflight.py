@@ -0,0 +1,75 @@
+# tools/singleflight.py
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight execution:
+the first caller runs the work and the others wait for its result.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from tools.metrics import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls made from threads"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn once for all concurrent callers with the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent identical coroutines on one event loop"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once for all concurrent callers with the same key.
+
+        The shared task is shielded, so one caller disconnecting does not cancel it for the others.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+        return await asyncio.shield(task)
@@ -0,0 +1,131 @@
+# tools/text_length.py
+"""
+Platform-accurate length counting and local trimming.
+X (Twitter) weighs text rather than counting characters: URLs count as 23,
+emoji and most non-Latin characters (CJK etc.) count as 2. Over-length posts
+are trimmed at sentence or hashtag boundaries instead of being regenerated.
+"""
+import re
+import unicodedata
+from typing import List, Optional
+
+from config.settings import settings
+
+TWITTER_URL_LENGTH = 23
+URL_PATTERN = re.compile(r'https?://\S+|\bwww\.\S+', re.IGNORECASE)
+TRAILING_HASHTAGS = re.compile(r'(?:\s*#\w+)+\s*$')
+SENTENCE_END = re.compile(r'(?<=[.!?])(?=\s)')
+
+# Code point ranges X counts with weight 1 (twitter-text v3 config); everything else is 2
+_LIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+
+_VARIATION_SELECTOR = 0xFE0F
+_ZWJ = 0x200D
+_KEYCAP = 0x20E3
+
+
+def _is_light(cp: int) -> bool:
+    return any(start <= cp <= end for start, end in _LIGHT_RANGES)
+
+
+def _is_emoji(cp: int) -> bool:
+    return 0x1F000 <= cp <= 0x1FAFF or 0x2600 <= cp <= 0x27BF or 0x2B00 <= cp <= 0x2BFF
+
+
+def _is_emoji_modifier(cp: int) -> bool:
+    return cp in (_VARIATION_SELECTOR, _KEYCAP) or 0x1F3FB <= cp <= 0x1F3FF or 0xE0020 <= cp <= 0xE007F
+
+
+def _weigh_twitter(text: str) -> int:
+    total = 0
+    i = 0
+    while i < len(text):
+        cp = ord(text[i])
+        next_cp = ord(text[i + 1]) if i + 1 < len(text) else None
+        if _is_emoji(cp) or next_cp in (_VARIATION_SELECTOR, _KEYCAP):
+            # One emoji sequence (modifiers, ZWJ joins, flag pairs) weighs 2
+            is_flag = 0x1F1E6 <= cp <= 0x1F1FF
+            i += 1
+            while i < len(text):
+                cp = ord(text[i])
+                if _is_emoji_modifier(cp):
+                    i += 1
+                elif cp == _ZWJ and i + 1 < len(text):
+                    i += 2
+                elif is_flag and 0x1F1E6 <= cp <= 0x1F1FF:
+                    is_flag = False
+                    i += 1
+                else:
+                    break
+            total += 2
+            continue
+        total += 1 if _is_light(cp) else 2
+        i += 1
+    return total
+
+
+def weighted_length(text: str, platform: str = "twitter") -> int:
+    """Length as the platform counts it against its limit"""
+    text = unicodedata.normalize("NFC", text)
+    if platform != "twitter":
+        return len(text)
+
+    total = 0
+    position = 0
+    for match in URL_PATTERN.finditer(text):
+        total += _weigh_twitter(text[position:match.start()]) + TWITTER_URL_LENGTH
+        position = match.end()
+    return total + _weigh_twitter(text[position:])
+
+
+def platform_limit(platform: str) -> int:
+    """Configured maximum length for a platform"""
+    return settings.MAX_LINKEDIN_LENGTH if platform == "linkedin" else settings.MAX_TWITTER_LENGTH
+
+
+def _join(sentences: List[str], tag_separator: str, tags: List[str]) -> str:
+    # Each sentence keeps its leading whitespace, so LinkedIn line breaks survive
+    body = "".join(sentences).strip()
+    return f"{body}{tag_separator}{' '.join(tags)}" if tags else body
+
+
+def smart_trim(text: str, platform: str = "twitter", limit: Optional[int] = None) -> str:
+    """Shorten text to fit the platform limit without a model round trip.
+
+    Drops middle sentences first (keeping the hook and the closing call to action),
+    then trailing hashtags beyond the first, then the closing sentence, and only
+    as a last resort cuts at a word boundary with an ellipsis.
+    """
+    limit = limit or platform_limit(platform)
+    text = text.strip()
+    if weighted_length(text, platform) <= limit:
+        return text
+
+    def fits(candidate: str) -> bool:
+        return weighted_length(candidate, platform) <= limit
+
+    tag_match = TRAILING_HASHTAGS.search(text)
+    body = text[:tag_match.start()] if tag_match else text
+    tags = tag_match.group(0).split() if tag_match else []
+    tag_separator = (re.match(r'\s*', tag_match.group(0)).group(0) or " ") if tag_match else " "
+    sentences = [s for s in SENTENCE_END.split(body) if s.strip()]
+
+    while len(sentences) > 2 and not fits(_join(sentences, tag_separator, tags)):
+        del sentences[-2]
+    while len(tags) > 1 and not fits(_join(sentences, tag_separator, tags)):
+        tags.pop()
+    while len(sentences) > 1 and not fits(_join(sentences, tag_separator, tags)):
+        sentences.pop()
+
+    candidate = _join(sentences, tag_separator, tags)
+    if fits(candidate):
+        return candidate
+
+    # Word-boundary cut of the remaining text, keeping room for the ellipsis
+    words = candidate.split(" ")
+    while len(words) > 1 and not fits(" ".join(words) + "…"):
+        words.pop()
+    candidate = " ".join(words).rstrip(",;:-") + "…"
+    while not fits(candidate):
+        candidate = candidate[:-2] + "…"
+    return candidate
@@ -1,8 +1,14 @@
 # safe_auto_twitter.py - Safe automated posting with content filtering
 import asyncio
+import contextlib
 import re
+from typing import List, Optional
 from workflows.content_pipeline import GeminiContentPipeline
-from tools.automation import RobustTwitterPoster
+from Twitter_main import RobustTwitterPoster
+from tools.inventory import ContentInventory, InventoryBuilder
+from tools.text_length import weighted_length
+from tools.safety import BANNED_KEYWORDS, find_violation
+from config.settings import settings
 
 class SafeTwitterAutomation:
     """Safe Twitter automation with content filtering and validation"""
@@ -10,13 +16,11 @@ class SafeTwitterAutomation:
     def __init__(self):
         self.pipeline = GeminiContentPipeline()
         self.poster = RobustTwitterPoster(headless=False)
+        self.inventory = ContentInventory()
+        self.refiller = None  # set by an InventoryBuilder running alongside
         
-        # Content safety filters
-        self.banned_keywords = [
-            "crash", "died", "dead", "killed", "tragedy", "disaster", 
-            "accident", "explosion", "terrorist", "attack", "bomb",
-            "murder", "suicide", "death", "funeral", "shooting"
-        ]
+        # Content safety filters (shared with the streaming writer guard)
+        self.banned_keywords = BANNED_KEYWORDS
         
         # Preferred safe topics
         self.safe_topics = [
@@ -35,27 +39,15 @@ class SafeTwitterAutomation:
     def validate_content(self, content: str) -> tuple[bool, str]:
         """Validate content for safety and quality"""
         
-        # Check for banned keywords
-        content_lower = content.lower()
-        for keyword in self.banned_keywords:
-            if keyword in content_lower:
-                return False, f"Contains sensitive keyword: {keyword}"
-        
-        # Check for potential fake news patterns
-        fake_news_patterns = [
-            r'\d+\s+(dead|died|killed)',  # "279 dead"
-            r'(breaking|urgent).*crash',
-            r'astrologer.*predict',
-            r'investigation.*death'
-        ]
-        
-        for pattern in fake_news_patterns:
-            if re.search(pattern, content_lower):
-                return False, f"Matches fake news pattern: {pattern}"
+        # Check for banned keywords and potential fake news patterns
+        violation = find_violation(content)
+        if violation:
+            return False, violation
         
-        # Check length
-        if len(content) > 280:
-            return False, f"Too long: {len(content)} characters"
+        # Check length as X counts it (URLs 23, emoji/CJK 2)
+        length = weighted_length(content)
+        if length > settings.MAX_TWITTER_LENGTH:
+            return False, f"Too long: {length} characters"
         
         if len(content) < 10:
             return False, "Too short"
@@ -67,8 +59,17 @@ class SafeTwitterAutomation:
         
         return True, "Content is safe"
     
-    async def generate_safe_content(self, topic: str, max_attempts: int = 3) -> dict:
-        """Generate safe content with multiple attempts"""
+    def interactive(self):
+        """Pause the background inventory refiller (if any) while the user waits"""
+        return self.refiller.interactive() if self.refiller else contextlib.nullcontext()
+    
+    async def generate_safe_content(self, topic: str, max_attempts: int = 3,
+                                    platforms: Optional[List[str]] = None, content_type: str = "educational") -> dict:
+        """Generate safe content with multiple attempts.
+        
+        Every requested platform's post is checked; LinkedIn posts only for banned content, not Twitter's limits.
+        """
+        platforms = platforms or ["twitter"]
         
         for attempt in range(max_attempts):
             print(f"🔄 Attempt {attempt + 1}: Generating content for '{topic}'")
@@ -76,27 +77,37 @@ class SafeTwitterAutomation:
             # Add safety instructions to the topic
             safe_topic = f"Write positive, educational content about {topic}. Focus on helpful tips, insights, or trends. Avoid any negative, tragic, or controversial content."
             
-            result = await self.pipeline.create_content(safe_topic, ["twitter"])
+            result = await self.pipeline.create_content(safe_topic, platforms, content_type)
             
             if result.get("status") == "error":
                 print(f"❌ Generation failed: {result.get('errors')}")
                 continue
             
-            content = result.get("final_twitter", "")
+            posts = {platform: result.get(f"final_{platform}") for platform in ("twitter", "linkedin") if platform in platforms}
             
-            if not content:
+            if not any(posts.values()):
                 print("❌ No content generated")
                 continue
             
             # Validate content
-            is_safe, reason = self.validate_content(content)
+            is_safe, reason = True, "Content is safe"
+            for platform, content in posts.items():
+                if not content:
+                    is_safe, reason = False, f"No {platform} content"
+                elif platform == "twitter":
+                    is_safe, reason = self.validate_content(content)
+                else:
+                    violation = find_violation(content)
+                    is_safe, reason = (False, violation) if violation else (True, reason)
+                if not is_safe:
+                    break
             
             if is_safe:
-                print(f"✅ Safe content generated: {content}")
+                print(f"✅ Safe content generated: {' | '.join(posts.values())}")
                 return result
             else:
                 print(f"⚠️ Content rejected: {reason}")
-                print(f"📝 Rejected content: {content}")
+                print(f"📝 Rejected content: {' | '.join(c for c in posts.values() if c)}")
                 continue
         
         print("❌ Failed to generate safe content after all attempts")
@@ -108,15 +119,31 @@ class SafeTwitterAutomation:
         print("🛡️ Safe Twitter Auto-Poster Starting...")
         
         # Get topic from user or use safe default
-        topic = input("📝 Enter topic (or press Enter for random safe topic): ").strip()
+        # (blocking calls run off the event loop so a background refiller keeps working)
+        topic = (await asyncio.to_thread(input, "📝 Enter topic (or press Enter for random safe topic): ")).strip()
         
         if not topic:
             import random
-            topic = random.choice(self.safe_topics)
+            # Prefer topics that already have ready content in the inventory
+            stocked_topics = [t for t, count in self.inventory.levels().items() if count and t in self.safe_topics]
+            topic = random.choice(stocked_topics or self.safe_topics)
             print(f"Using safe topic: {topic}")
         
-        # Generate safe content
-        result = await self.generate_safe_content(topic)
+        # Take ready content from the inventory, generate only on a miss
+        result = self.inventory.take(topic)
+        if result:
+            print("📦 Using pre-generated content from inventory")
+            # Re-check in case safety rules changed since it was stocked
+            is_safe, reason = self.validate_content(result["content"])
+            if not is_safe:
+                print(f"⚠️ Inventory content rejected: {reason}")
+                result = None
+            else:
+                result = {"final_twitter": result["content"], "hashtags": result["hashtags"]}
+        
+        if not result:
+            async with self.interactive():
+                result = await self.generate_safe_content(topic)
         
         if not result:
             print("❌ Could not generate safe content. Please try a different topic.")
@@ -127,11 +154,11 @@ class SafeTwitterAutomation:
         # Show content for approval
         print(f"\n✅ Generated safe content:")
         print(f"📝 Tweet: {content}")
-        print(f"📏 Length: {len(content)} characters")
+        print(f"📏 Length: {weighted_length(content)} characters")
         print(f"🏷️ Hashtags: {result.get('hashtags', [])}")
         
         # Get user approval
-        choice = input(f"\n🤔 Post this to Twitter? (y/n): ").strip().lower()
+        choice = (await asyncio.to_thread(input, "\n🤔 Post this to Twitter? (y/n): ")).strip().lower()
         
         if choice != 'y':
             print("👍 Content saved to files. You can copy-paste manually!")
@@ -139,15 +166,16 @@ class SafeTwitterAutomation:
         
         # Attempt automated posting
         print("\n🤖 Attempting automated posting...")
-        success = self.poster.post_to_twitter(content)
+        async with self.interactive():
+            success = await asyncio.to_thread(self.poster.post_to_twitter, content)
         
         if success:
             print("🎉 SUCCESS! Posted to Twitter automatically!")
         else:
             print("🎯 Automated posting failed. Switching to guided mode...")
-            self.poster.guided_posting_mode(content)
+            await asyncio.to_thread(self.poster.guided_posting_mode, content)
         
-        self.poster.close()
+        await asyncio.to_thread(self.poster.close)
 
 # Batch safe content generator
 async def generate_safe_content_batch():
@@ -184,13 +212,91 @@ async def generate_safe_content_batch():
     print(f"\n📄 Batch content saved to: {filename}")
     print("💡 Review and schedule these posts throughout the week!")
 
+# Background inventory builder
+async def build_content_inventory(run_forever: bool = False):
+    """Stock validated posts for every safe topic, optionally refilling forever"""
+    
+    automation = SafeTwitterAutomation()
+    builder = InventoryBuilder(automation, automation.inventory)
+    
+    print(f"📦 Building content inventory ({builder.target_per_topic} posts per topic)...")
+    
+    if run_forever:
+        print(f"🔁 Refilling every {builder.refill_interval:.0f} seconds. Press Ctrl+C to stop.")
+        await builder.run_forever()
+    else:
+        stocked = await builder.refill_once()
+        print(f"\n✅ Stocked {stocked} new posts")
+        for topic, count in sorted(automation.inventory.levels().items()):
+            print(f"  • {topic}: {count} ready")
+
+async def post_with_background_refill():
+    """Interactive posting while the inventory refills in the background during idle time"""
+    
+    automation = SafeTwitterAutomation()
+    builder = InventoryBuilder(automation, automation.inventory)
+    builder.start()
+    print(f"📦 Refilling inventory in the background ({builder.target_per_topic} posts per topic)")
+    
+    try:
+        while True:
+            await automation.auto_post_safe_content()
+            again = (await asyncio.to_thread(input, "\n🔁 Post another? (y/n): ")).strip().lower()
+            if again != "y":
+                break
+    finally:
+        builder.stop()
+
+def post_queue_across_accounts(queue_file: str):
+    """Post a JSONL queue of {"account", "content"} items, one browser per account in parallel"""
+    import json
+    from tools.posting_pool import PostingDispatcher
+    
+    with open(queue_file, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    
+    accounts = settings.POSTING_ACCOUNTS or sorted({item["account"] for item in items})
+    dispatcher = PostingDispatcher(accounts)
+    print(f"📬 Queued {len(items)} posts across {len(accounts)} accounts")
+    
+    try:
+        futures = []
+        for item in items:
+            if item["account"] not in dispatcher.workers:
+                print(f"⏭️ Skipping post for unknown account {item['account']} (not in POSTING_ACCOUNTS)")
+                continue
+            violation = find_violation(item["content"])
+            if violation:
+                print(f"⏭️ Skipping post for {item['account']}: {violation}")
+                continue
+            futures.append((item["account"], dispatcher.submit(item["account"], item["content"])))
+        
+        for account, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                # The account's browser never started; its other posts fail the same way
+                print(f"❌ [{account}] post not sent: {str(e)}")
+    finally:
+        # Always close every browser, even if something above failed
+        dispatcher.close()
+    
+    print("\n📊 Per-account posting stats:")
+    for account, stats in dispatcher.stats().items():
+        print(f"  • {account}: {stats['posted']} posted, {stats['failed']} failed, "
+              f"{stats['avg_post_seconds']}s/post, {stats['posts_per_hour']}/hour")
+
 if __name__ == "__main__":
     print("🛡️ Safe Twitter Automation Options:")
     print("1. Generate and post single safe content")
     print("2. Generate batch content for planning")
     print("3. Test Twitter automation only")
+    print("4. Build content inventory (top up once)")
+    print("5. Run inventory refiller (until Ctrl+C)")
+    print("6. Post a queue file across multiple accounts")
+    print("7. Post interactively, refilling inventory in the background")
     
-    choice = input("Choose option (1-3): ").strip()
+    choice = input("Choose option (1-7): ").strip()
     
     if choice == "1":
         automation = SafeTwitterAutomation()
@@ -202,6 +308,15 @@ if __name__ == "__main__":
         test_content = "Testing my AI automation! 🤖 #AI #Test #Automation"
         poster.post_to_twitter(test_content)
         poster.close()
+    elif choice == "4":
+        asyncio.run(build_content_inventory())
+    elif choice == "5":
+        asyncio.run(build_content_inventory(run_forever=True))
+    elif choice == "6":
+        queue_file = input("📄 Queue file (JSONL of account/content): ").strip()
+        post_queue_across_accounts(queue_file)
+    elif choice == "7":
+        asyncio.run(post_with_background_refill())
     else:
         print("Running safe auto-posting...")
         automation = SafeTwitterAutomation()
@@ -0,0 +1,45 @@
+# workflows/budget.py
+"""
+Per-request latency budget helpers.
+The deadline travels through ContentState as an epoch timestamp, so a run
+resumed on another worker still honours it. Nodes use these helpers to pick
+a model tier and call timeout, and to decide when to degrade.
+"""
+import time
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+
+
+def deadline_from_budget(budget_seconds: Optional[float]) -> Optional[float]:
+    """Absolute deadline for a request budget, or None for no budget"""
+    if not budget_seconds:
+        return None
+    return time.time() + budget_seconds
+
+
+def remaining_budget(state: Dict[str, Any]) -> Optional[float]:
+    """Seconds left before the request deadline, or None if the request has no budget"""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def budget_below(remaining: Optional[float], threshold: float) -> bool:
+    """True if the request has a budget and less than threshold seconds remain"""
+    return remaining is not None and remaining < threshold
+
+
+def node_tier(node: str, remaining: Optional[float]) -> str:
+    """Model tier for a node: its configured tier, or the fast tier when the budget is tight"""
+    if budget_below(remaining, settings.BUDGET_FAST_TIER_BELOW):
+        return "fast"
+    return settings.NODE_MODEL_TIERS.get(node, "standard")
+
+
+def call_timeout(remaining: Optional[float]) -> Optional[float]:
+    """Per-call deadline that fits the remaining budget (never below MIN_CALL_TIMEOUT)"""
+    if remaining is None:
+        return None
+    return max(settings.MIN_CALL_TIMEOUT, min(remaining, settings.MODEL_CALL_TIMEOUT))
@@ -1,90 +1,174 @@
 # workflows/content_pipeline_gemini.py
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any, List
+from langgraph.checkpoint.sqlite import SqliteSaver
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+import asyncio
+import copy
+import sqlite3
+import threading
+import time
+import uuid
 
 # FIXED: Import from the correct Gemini files
 from agents.researcher import gemini_research_node
-from agents.writer import gemini_write_twitter_node, gemini_write_linkedin_node
+from agents.writer import gemini_write_twitter_node, gemini_write_linkedin_node, gemini_write_variants_node
 from workflows.state import ContentState
+from workflows.budget import deadline_from_budget
+from config.settings import settings
+from tools.cache import open_shared_db
+from tools.blob_store import blob_store
+from tools.singleflight import AsyncSingleFlight
+from tools.hashtags import get_hashtag_index
+from tools.metrics import metrics
+from tools.profiling import profile_run, should_profile
 
-class GeminiContentPipeline:
-    def __init__(self):
-        self.workflow = self._create_workflow()
-    
-    def _create_workflow(self) -> StateGraph:
-        """Create the main content creation workflow using Gemini"""
-        
-        # Initialize the state graph
-        workflow = StateGraph(ContentState)
-        
-        # Add nodes
-        workflow.add_node("research", gemini_research_node)
-        workflow.add_node("write_twitter", gemini_write_twitter_node)
-        workflow.add_node("write_linkedin", gemini_write_linkedin_node)
-        workflow.add_node("finalize", self._finalize_content)
-        
-        # Define the flow
-        workflow.set_entry_point("research")
-        
-        # After research, decide which platforms to write for
-        workflow.add_conditional_edges(
-            "research",
-            self._decide_platforms,
-            {
-                "twitter_only": "write_twitter",
-                "linkedin_only": "write_linkedin", 
-                "both_twitter_first": "write_twitter",
-                "error": END
-            }
+# Shared by all pipeline instances so duplicate requests coalesce process-wide
+_content_flight = AsyncSingleFlight("create_content")
+
+class NodeFailedError(Exception):
+    """Raised when a node reports an error, so the run stops at its last checkpoint"""
+
+def _checkpointed(name: str, node):
+    """Wrap a node so an error status fails the step instead of being written as progress"""
+    def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        result = node(state)
+        if result.get("status") == "error":
+            errors = result.get("errors") or []
+            raise NodeFailedError(errors[-1] if errors else f"{name} failed")
+        return result
+    return run
+
+def create_sqlite_checkpointer(db_path: Optional[str] = None) -> SqliteSaver:
+    """Open the local SQLite checkpointer used to resume interrupted runs"""
+    # WAL mode lets every server worker resume runs started by another
+    return SqliteSaver(open_shared_db(db_path or settings.CHECKPOINT_DB))
+
+# Writer nodes run for each platform set. Every compiled graph is a straight line,
+# so no routing function runs per request.
+PLATFORM_WRITERS = {
+    ("twitter",): ("write_twitter",),
+    ("linkedin",): ("write_linkedin",),
+    ("linkedin", "twitter"): ("write_twitter", "write_linkedin"),
+}
+VARIANT_WRITERS = ("write_variants",)  # several content types: all writers fan out in one node
+WRITER_NODES = {
+    "write_twitter": gemini_write_twitter_node,
+    "write_linkedin": gemini_write_linkedin_node,
+    "write_variants": gemini_write_variants_node,
+}
+
+# Compiled graphs shared by every pipeline instance in the process
+_graphs: Dict[Tuple, Tuple[Any, Any]] = {}
+_graphs_lock = threading.Lock()
+_shared_checkpointer: Optional[SqliteSaver] = None
+
+def shared_checkpointer() -> SqliteSaver:
+    """Process-wide default checkpointer"""
+    global _shared_checkpointer
+    with _graphs_lock:
+        if _shared_checkpointer is None:
+            _shared_checkpointer = create_sqlite_checkpointer()
+        return _shared_checkpointer
+
+def touch_run(run_id: str, checkpointer: Optional[SqliteSaver] = None):
+    """Note that a run just ran; its checkpoints are kept for CHECKPOINT_TTL after this"""
+    checkpointer = checkpointer or shared_checkpointer()
+    with checkpointer.lock:
+        checkpointer.conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_runs (thread_id TEXT PRIMARY KEY, last_run_at REAL NOT NULL)"
         )
-        
-        # From Twitter, either go to LinkedIn or finalize
-        workflow.add_conditional_edges(
-            "write_twitter",
-            self._after_twitter,
-            {
-                "linkedin_next": "write_linkedin",
-                "finalize": "finalize",
-                "error": END
-            }
+        checkpointer.conn.execute(
+            "INSERT OR REPLACE INTO checkpoint_runs (thread_id, last_run_at) VALUES (?, ?)", (run_id, time.time())
         )
-        
-        # From LinkedIn, finalize
-        workflow.add_edge("write_linkedin", "finalize")
-        workflow.add_edge("finalize", END)
-        
-        return workflow.compile()
+        checkpointer.conn.commit()
+
+def purge_checkpoints(max_age: Optional[float] = None, checkpointer: Optional[SqliteSaver] = None) -> int:
+    """Delete the checkpoints of runs that haven't run for max_age seconds (CHECKPOINT_TTL).
+    Returns the number of runs removed; those can no longer be resumed."""
+    checkpointer = checkpointer or shared_checkpointer()
+    max_age = settings.CHECKPOINT_TTL if max_age is None else max_age
+    now = time.time()
+    conn = checkpointer.conn
+    with checkpointer.lock:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_runs (thread_id TEXT PRIMARY KEY, last_run_at REAL NOT NULL)"
+        )
+        try:
+            # Runs checkpointed before they were tracked age from now
+            conn.execute(
+                "INSERT OR IGNORE INTO checkpoint_runs (thread_id, last_run_at) "
+                "SELECT DISTINCT thread_id, ? FROM checkpoints", (now,)
+            )
+        except sqlite3.OperationalError:
+            # No run has been checkpointed yet
+            conn.commit()
+            return 0
+        expired = [(row[0],) for row in conn.execute(
+            "SELECT thread_id FROM checkpoint_runs WHERE last_run_at < ?", (now - max_age,)
+        )]
+        for table in ("writes", "checkpoints", "checkpoint_runs"):
+            conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", expired)
+        conn.commit()
+    if expired:
+        metrics.incr("pipeline.checkpoints_purged", len(expired))
+    return len(expired)
+
+def graph_variant(platforms: List[str], content_types: Optional[List[str]] = None) -> Tuple[str, ...]:
+    """Writer node sequence for a request; unknown or missing platforms mean Twitter"""
+    if len(content_types or []) > 1:
+        return VARIANT_WRITERS
+    platform_set = tuple(sorted({p for p in platforms or [] if p in ("twitter", "linkedin")})) or ("twitter",)
+    return PLATFORM_WRITERS[platform_set]
+
+def _build_graph(writers: Tuple[str, ...], checkpointer: SqliteSaver):
+    """Compile a linear research -> writers -> finalize graph"""
+    workflow = StateGraph(ContentState)
     
-    def _decide_platforms(self, state: Dict[str, Any]) -> str:
-        """Decide which platforms to create content for"""
-        if state.get("status") == "error":
-            return "error"
-            
-        platforms = state.get("target_platforms", ["twitter"])
-        
-        if "twitter" in platforms and "linkedin" in platforms:
-            return "both_twitter_first"
-        elif "twitter" in platforms:
-            return "twitter_only"
-        elif "linkedin" in platforms:
-            return "linkedin_only"
-        else:
-            return "twitter_only"  # Default
+    # Nodes are checkpointed after each successful step; a failing node raises and ends the run
+    workflow.add_node("research", _checkpointed("research", gemini_research_node))
+    for name in writers:
+        workflow.add_node(name, _checkpointed(name, WRITER_NODES[name]))
+    workflow.add_node("finalize", GeminiContentPipeline._finalize_content)
     
-    def _after_twitter(self, state: Dict[str, Any]) -> str:
-        """Decide what to do after Twitter content is created"""
-        if state.get("status") == "error":
-            return "error"
-            
-        platforms = state.get("target_platforms", ["twitter"])
-        
-        if "linkedin" in platforms and not state.get("linkedin_content"):
-            return "linkedin_next"
-        else:
-            return "finalize"
+    workflow.set_entry_point("research")
+    previous = "research"
+    for name in (*writers, "finalize"):
+        workflow.add_edge(previous, name)
+        previous = name
+    workflow.add_edge("finalize", END)
+    
+    return workflow.compile(checkpointer=checkpointer)
+
+def get_compiled_graph(writers: Tuple[str, ...], checkpointer: SqliteSaver):
+    """Compiled graph for a variant, built once per process and checkpointer"""
+    key = (writers, id(checkpointer))
+    with _graphs_lock:
+        if key not in _graphs:
+            # The checkpointer is kept with the graph so its id can't be reused
+            _graphs[key] = (checkpointer, _build_graph(writers, checkpointer))
+            metrics.incr("pipeline.graphs_compiled")
+        return _graphs[key][1]
+
+def precompile_graphs(checkpointer: Optional[SqliteSaver] = None) -> int:
+    """Compile every variant ahead of the first request. Returns the number of variants."""
+    checkpointer = checkpointer or shared_checkpointer()
+    variants = [*PLATFORM_WRITERS.values(), VARIANT_WRITERS]
+    for writers in variants:
+        get_compiled_graph(writers, checkpointer)
+    return len(variants)
+
+class GeminiContentPipeline:
+    def __init__(self, checkpointer: Optional[SqliteSaver] = None):
+        # Cheap: graphs are compiled once per process and shared
+        self.checkpointer = checkpointer or shared_checkpointer()
     
-    def _finalize_content(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def graph_for(self, platforms: List[str], content_types: Optional[List[str]] = None):
+        """Compiled graph specialized for a request's platforms and content types"""
+        return get_compiled_graph(graph_variant(platforms, content_types), self.checkpointer)
+    
+    @staticmethod
+    def _finalize_content(state: Dict[str, Any]) -> Dict[str, Any]:
         """Finalize the content creation process"""
         print("✅ Finalizing content...")
         
@@ -100,56 +184,144 @@ class GeminiContentPipeline:
             content["linkedin"] = state["linkedin_content"]
         
         content["hashtags"] = state.get("hashtags", [])
+        if state.get("variants"):
+            content["variants"] = state["variants"]
         
         # Save content using free alternatives
         posting_manager = AlternativePostingManager()
         automation_tools = FreeAutomationTools()
         
         # Save to files
-        json_file = posting_manager.save_content_to_file(content, state["topic"])
-        html_file = posting_manager.create_content_card(content, state["topic"])
+        # The full research (kept out of state) is archived with the content it produced
+        research = blob_store.get(state.get("research_ref"))
+        index_hashtags = not state.get("hashtags_fallback")
+        json_file = posting_manager.save_content_to_file(
+            content, state["topic"], state.get("run_id"), research, index_hashtags
+        )
+        html_file = posting_manager.create_content_card(content, state["topic"], state.get("run_id"))
+        
+        # Feed the local hashtag index so later runs are seeded with these tags
+        # (fallback tags aren't fed back, or they would be "proven" by their own reuse)
+        hashtag_index = get_hashtag_index()
+        if index_hashtags:
+            hashtag_index.add(state["topic"], content["hashtags"])
+        hashtag_index.mark_indexed(json_file)
         
-        # Try to send to Discord/Zapier if configured
+        # Try to send to Discord/Zapier and queue the email digest if configured
         automation_tools.send_to_discord(content, state["topic"])
         automation_tools.send_to_zapier(content, state["topic"])
+        email_queued = automation_tools.queue_email_digest(content, state["topic"])
         
         print(f"📄 Content saved to: {json_file}")
         print(f"🎨 Visual card created: {html_file}")
         print("💡 Open the HTML file in your browser for easy copy-paste!")
         
         return {
-            **state,
             "final_twitter": state.get("twitter_content"),
             "final_linkedin": state.get("linkedin_content"),
+            "variants": state.get("variants"),
             "content_files": {
                 "json": json_file,
                 "html": html_file
             },
+            "email_queued": email_queued,
             "status": "completed",
             "completed_at": datetime.now().isoformat()
         }
     
-    async def create_content(self, topic: str, platforms: List[str] = ["twitter"], content_type: str = "educational") -> Dict[str, Any]:
-        """Main method to create content using Gemini"""
+    async def create_content(self, topic: str, platforms: List[str] = ["twitter"], content_type: str = "educational", run_id: Optional[str] = None, latency_budget: Optional[float] = None, content_types: Optional[List[str]] = None, profile: bool = False) -> Dict[str, Any]:
+        """Main method to create content using Gemini.
+        
+        Passing the run_id of a failed run resumes it from its last completed node.
+        latency_budget (seconds) sets a deadline; nodes degrade to meet it.
+        content_types researches once and returns a variant per content type.
+        profile records a sampling profile of the run (see tools/profiling.py).
+        Concurrent identical requests share one run.
+        """
+        loop = asyncio.get_running_loop()
+        profile = should_profile(profile)
+        
+        if content_types:
+            # De-duplicate; a single type is just a regular run
+            content_types = list(dict.fromkeys(content_types))
+            content_type = content_types[0]
+            if len(content_types) == 1:
+                content_types = None
+        
+        def run():
+            return self._run(topic, platforms, content_type, run_id, latency_budget, content_types, profile)
+        
+        if run_id or profile:
+            # Resuming a specific run or profiling one is never coalesced with fresh requests
+            return await loop.run_in_executor(None, run)
+        
+        key = (topic, tuple(sorted(platforms)), content_type, tuple(content_types or ()), latency_budget)
+        result = await _content_flight.do(key, lambda: loop.run_in_executor(None, run))
+        # Each caller gets its own copy of the shared result (nested lists and dicts included)
+        return copy.deepcopy(result)
+    
+    def _run(self, topic: str, platforms: List[str], content_type: str, run_id: Optional[str], latency_budget: Optional[float], content_types: Optional[List[str]] = None, profile: bool = False) -> Dict[str, Any]:
+        """Run or resume the workflow (blocking, executed off the event loop)"""
+        
+        run_id = run_id or uuid.uuid4().hex
+        with profile_run(run_id, profile) as profile_files:
+            result = self._invoke(topic, platforms, content_type, run_id, latency_budget, content_types)
+        if profile_files:
+            result = {**result, "profile_files": profile_files}
+        return result
+    
+    def _invoke(self, topic: str, platforms: List[str], content_type: str, run_id: str, latency_budget: Optional[float], content_types: Optional[List[str]]) -> Dict[str, Any]:
+        config = {"configurable": {"thread_id": run_id}}
+        workflow = self.graph_for(platforms, content_types)
+        deadline = deadline_from_budget(latency_budget or settings.DEFAULT_LATENCY_BUDGET)
         
         initial_state = {
             "topic": topic,
             "target_platforms": platforms,
             "content_type": content_type,
+            "content_types": content_types,
+            "run_id": run_id,
+            "deadline": deadline,
             "created_at": datetime.now(),
             "status": "starting",
             "errors": []
         }
         
-        print(f"🚀 Starting content creation with Gemini for: {topic}")
-        print(f"📱 Target platforms: {', '.join(platforms)}")
-        
         try:
-            # Run the workflow
-            result = self.workflow.invoke(initial_state)
+            touch_run(run_id, self.checkpointer)
+            snapshot = workflow.get_state(config)
+            
+            if snapshot.values.get("target_platforms"):
+                # An existing run keeps its own topic, platforms and content types, whatever this request says
+                platforms = snapshot.values["target_platforms"]
+                content_types = snapshot.values.get("content_types")
+                initial_state.update(
+                    topic=snapshot.values.get("topic", topic),
+                    target_platforms=platforms,
+                    content_types=content_types,
+                    content_type=snapshot.values.get("content_type", content_type)
+                )
+                run_workflow = self.graph_for(platforms, content_types)
+                if run_workflow is not workflow:
+                    workflow = run_workflow
+                    snapshot = workflow.get_state(config)
+            
+            if snapshot.next:
+                # Interrupted run: continue from the last checkpoint
+                print(f"♻️ Resuming run {run_id} at: {', '.join(snapshot.next)}")
+                # The retry gets a fresh budget rather than the expired one
+                workflow.update_state(config, {"deadline": deadline})
+                result = workflow.invoke(None, config)
+            elif snapshot.values.get("status") == "completed":
+                print(f"✅ Run {run_id} already completed")
+                result = snapshot.values
+            else:
+                print(f"🚀 Starting content creation with Gemini for: {topic}")
+                print(f"📱 Target platforms: {', '.join(platforms)}")
+                result = workflow.invoke(initial_state, config)
             return result
         except Exception as e:
-            print(f"❌ Workflow error: {str(e)}")
+            print(f"❌ Workflow error (run {run_id}): {str(e)}")
             return {
                 **initial_state,
                 "status": "error",
@@ -157,7 +329,10 @@ class GeminiContentPipeline:
             }
 
 # Helper function for direct usage
-async def create_gemini_content_pipeline(topic: str, platforms: List[str] = ["twitter"], content_type: str = "educational") -> Dict[str, Any]:
+async def create_gemini_content_pipeline(topic: str, platforms: List[str] = ["twitter"], content_type: str = "educational", run_id: Optional[str] = None, latency_budget: Optional[float] = None, content_types: Optional[List[str]] = None) -> Dict[str, Any]:
     """Helper function to create content using Gemini"""
     pipeline = GeminiContentPipeline()
-    return await pipeline.create_content(topic, platforms, content_type)
\ No newline at end of file
+    return await pipeline.create_content(topic, platforms, content_type, run_id, latency_budget, content_types)
+
+# Backwards-compatible name used by the API server and CLI entry points
+ContentPipeline = GeminiContentPipeline
\ No newline at end of file
@@ -1,18 +1,24 @@
 # workflows/state.py
-from typing import TypedDict, List, Optional, Dict, Any
+from typing import TypedDict, List, Optional, Dict, Any, Annotated
+import operator
 from pydantic import BaseModel
 from datetime import datetime
 
 class ContentState(TypedDict):
-    """State that flows through our LangGraph workflow"""
+    """State that flows through our LangGraph workflow.
+    
+    Nodes return only the keys they change. Large values live in the blob
+    store (tools/blob_store.py) and are referenced by id.
+    """
     
     # Input
     topic: str
     target_platforms: List[str]  # ["twitter", "linkedin"]
     content_type: Optional[str]  # "educational", "entertaining", "promotional"
+    content_types: Optional[List[str]]  # several types: one research pass, one variant per type
     
     # Research phase
-    research_data: Optional[Dict[str, Any]]
+    research_ref: Optional[str]  # blob id of the full research result (incl. raw search text)
     key_insights: Optional[List[str]]
     trending_info: Optional[Dict[str, Any]]
     
@@ -20,31 +26,52 @@ class ContentState(TypedDict):
     twitter_content: Optional[str]
     linkedin_content: Optional[str]
     hashtags: Optional[List[str]]
+    hashtags_fallback: Optional[bool]  # stock tags from a failed writer; not added to the hashtag index
+    variants: Optional[Dict[str, Dict[str, str]]]  # content type -> platform -> text
     
     # Review & editing
     content_feedback: Optional[str]
     final_twitter: Optional[str]
     final_linkedin: Optional[str]
+    content_files: Optional[Dict[str, str]]
+    email_queued: Optional[bool]  # content went into the email digest queue
     
     # Scheduling
     suggested_post_times: Optional[Dict[str, datetime]]
     scheduled: Optional[bool]
     
     # Metadata
+    deadline: Optional[float]  # epoch seconds; nodes degrade as it approaches
+    run_id: Optional[str]  # checkpoint thread id, reuse it to resume a failed run
     created_at: datetime
     status: str  # "researching", "writing", "reviewing", "scheduled", "posted"
-    errors: Optional[List[str]]
+    completed_at: Optional[str]
+    errors: Annotated[List[str], operator.add]  # nodes return only new errors
+
+class ResearchData(BaseModel):
+    """Structured research output produced by the research agent"""
+    insights: List[str] = []
+    trends: List[str] = []
+    content_angles: List[str] = []
+    debates: List[str] = []
+    tips: List[str] = []
 
 class PostRequest(BaseModel):
     """API request model"""
     topic: str
     platforms: List[str] = ["twitter"]
     content_type: str = "educational"
+    content_types: Optional[List[str]] = None  # e.g. all three types for A/B variants, researched once
     schedule_immediately: bool = False
+    run_id: Optional[str] = None  # resume a previously failed run
+    latency_budget_ms: Optional[int] = None  # e.g. 3000 to answer within 3 s
     
 class PostResponse(BaseModel):
     """API response model"""
     success: bool
     message: str
     content: Optional[Dict[str, str]] = None
-    post_urls: Optional[Dict[str, str]] = None
\ No newline at end of file
+    post_urls: Optional[Dict[str, str]] = None
+    variants: Optional[Dict[str, Dict[str, str]]] = None  # content type -> platform -> text
+    run_id: Optional[str] = None
+    profile_url: Optional[str] = None  # set for profiled runs
\ No newline at end of file
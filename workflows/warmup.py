@@ -0,0 +1,153 @@
+# workflows/warmup.py
+"""
+Startup warm-up for the API server.
+Builds everything the first request would otherwise pay for (graphs, provider
+clients, search tool, caches and stores) and makes one cheap call per model
+tier the pipeline uses, so /ready only passes once the worker can serve a
+request at full speed.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+from tools.metrics import metrics
+
+WARMUP_PROMPT = "Reply with the single word OK."
+
+# Without these the worker can't serve requests, so it stays unready
+REQUIRED_STEPS = ("pipeline", "graphs", "providers")
+
+
+class WarmupStatus:
+    """Progress of this worker's warm-up, reported by /ready"""
+
+    def __init__(self):
+        self.ready = False
+        self.failed_steps: List[str] = []
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.steps: Dict[str, float] = {}  # step -> milliseconds
+        self.errors: List[str] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else ("failed" if self.finished_at else "warming"),
+            "failed_steps": self.failed_steps,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps_ms": self.steps,
+            "errors": self.errors
+        }
+
+
+warmup_status = WarmupStatus()
+
+
+def _step(name: str, fn: Callable[[], Any]) -> Any:
+    started = time.monotonic()
+    try:
+        return fn()
+    except Exception as e:
+        warmup_status.failed_steps.append(name)
+        warmup_status.errors.append(f"{name}: {str(e)}")
+        print(f"⚠️ Warm-up step '{name}' failed: {str(e)}")
+    finally:
+        elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        warmup_status.steps[name] = elapsed_ms
+        metrics.set_gauge(f"warmup.{name}_ms", elapsed_ms)
+
+
+def _open_stores():
+    from tools.cache import search_cache, llm_cache, research_cache
+    from tools.blob_store import blob_store
+    from tools.hashtags import get_hashtag_index
+    from tools.idempotency import get_idempotency_store
+
+    # A lookup opens the connection and creates the table
+    for cache in (search_cache, llm_cache, research_cache):
+        cache.get("warmup")
+    blob_store.get("blob:warmup")
+    get_idempotency_store()
+    get_hashtag_index()
+
+
+def purge_stores() -> Dict[str, int]:
+    """Delete expired cache entries and blobs, and checkpoints of runs older than CHECKPOINT_TTL.
+    Run at warm-up and then every STORE_PURGE_INTERVAL seconds by the API server."""
+    from tools.cache import purge_all_expired
+    from workflows.content_pipeline import purge_checkpoints
+
+    purged = {"cache_entries": purge_all_expired(), "checkpoint_runs": purge_checkpoints()}
+    if any(purged.values()):
+        print(f"🧹 Purged {purged['cache_entries']} expired cache entries and "
+              f"checkpoints of {purged['checkpoint_runs']} old runs")
+    return purged
+
+
+def _build_agents():
+    from agents.researcher import GeminiResearchAgent
+    from agents.writer import GeminiContentWriter
+
+    # Constructs the search tool and loads the writer's hashtag index
+    GeminiResearchAgent()
+    GeminiContentWriter()
+
+
+def _precompile_graphs():
+    from workflows.content_pipeline import precompile_graphs
+
+    precompile_graphs()
+
+
+def _model_calls():
+    from agents.providers import get_router
+
+    if not settings.WARMUP_MODEL_CALL:
+        return
+    router = get_router()
+    # Every tier a node may use: its configured one, plus "fast" for tight budgets.
+    # Tiers backed by the same model share one call.
+    tiers = {}
+    for tier in list(settings.NODE_MODEL_TIERS.values()) + ["fast"]:
+        provider = router.ranked(tier)[0]
+        tiers.setdefault((provider.name, provider.model_for_tier(tier)), tier)
+
+    with ThreadPoolExecutor(max_workers=len(tiers)) as pool:
+        calls = [pool.submit(router.generate, WARMUP_PROMPT, tier=tier, timeout=settings.WARMUP_TIMEOUT)
+                 for tier in tiers.values()]
+        for call in calls:
+            call.result()
+
+
+def warm_up(build_pipeline: Callable[[], Any]) -> Any:
+    """Run every warm-up step (blocking) and return the built pipeline.
+
+    Optional steps that fail are reported but don't keep the worker out of
+    rotation: requests still work, they are just slower or use fallbacks.
+    If a REQUIRED_STEPS step fails, the worker is never marked ready.
+    """
+    from agents.providers import get_router
+
+    warmup_status.started_at = datetime.now().isoformat()
+    print("🔥 Warming up...")
+
+    pipeline = _step("pipeline", build_pipeline)
+    _step("graphs", _precompile_graphs)
+    _step("providers", get_router)
+    _step("stores", _open_stores)
+    _step("purge", purge_stores)
+    _step("agents", _build_agents)
+    _step("model_calls", _model_calls)
+
+    failed_required = [step for step in REQUIRED_STEPS if step in warmup_status.failed_steps]
+    warmup_status.finished_at = datetime.now().isoformat()
+    if failed_required:
+        metrics.set_gauge("warmup.ready", 0)
+        print(f"❌ Warm-up failed ({', '.join(failed_required)}); worker stays unready")
+        return pipeline
+    warmup_status.ready = True
+    metrics.set_gauge("warmup.ready", 1)
+    print(f"✅ Warm-up finished in {sum(warmup_status.steps.values()):.0f} ms")
+    return pipeline